@@ -2,13 +2,51 @@
 """Returns a list of delays in ascending order"""
 
 import asyncio
-from typing import List
+from typing import AsyncIterator, List, Optional
 
 wait_random = __import__("0-basic_async_syntax").wait_random
 
 
-async def wait_n(n: int, max_delay: int = 10) -> List[float]:
-    """Spawn `wait_random` `n` times with the specified `max_delay`"""
+async def wait_n(n: int, max_delay: int = 10,
+                 max_concurrency: Optional[int] = None) -> List[float]:
+    """Spawn `wait_random` `n` times with the specified `max_delay`
+
+    With `max_concurrency`, no more than that many run at once.
+    """
+    if max_concurrency is not None:
+        return [delay async for delay
+                in iter_wait_n(n, max_delay, max_concurrency)]
     tasks = [asyncio.create_task(wait_random(max_delay)) for _ in range(n)]
     delay = [await task for task in asyncio.as_completed(tasks)]
     return delay
+
+
+async def iter_wait_n(n: int, max_delay: int = 10,
+                      max_concurrency: int = 1000) -> AsyncIterator[float]:
+    """Yield the delays of `n` `wait_random` calls as they complete
+
+    At most `max_concurrency` calls are in flight and each finished one
+    is replaced at once, so memory stays bounded by `max_concurrency`
+    whatever `n`. Calls still running when the iteration stops early
+    are cancelled.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+    finished: asyncio.Queue = asyncio.Queue()
+    running = set()
+    started = 0
+    try:
+        while started < n or running:
+            while started < n and len(running) < max_concurrency:
+                task = asyncio.create_task(wait_random(max_delay))
+                task.add_done_callback(finished.put_nowait)
+                running.add(task)
+                started += 1
+            task = await finished.get()
+            running.discard(task)
+            yield task.result()
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
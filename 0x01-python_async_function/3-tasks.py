@@ -2,10 +2,27 @@
 """Returns an asyncio.Task"""
 
 import asyncio
+from typing import Optional
 
 wait_random = __import__("0-basic_async_syntax").wait_random
 
 
-def task_wait_random(max_delay: int) -> asyncio.Task:
-    """Takes an integer `max_delay` and returns a asyncio.Task"""
-    return asyncio.create_task(wait_random(max_delay))
+async def wait_random_for(max_delay: int,
+                          timeout: Optional[float] = None) -> Optional[float]:
+    """`wait_random` cut off after `timeout` seconds, None if it was"""
+    try:
+        return await asyncio.wait_for(wait_random(max_delay), timeout)
+    except asyncio.TimeoutError:
+        return None
+
+
+def task_wait_random(max_delay: int,
+                     timeout: Optional[float] = None) -> asyncio.Task:
+    """Takes an integer `max_delay` and returns a asyncio.Task
+
+    With `timeout`, the task gives up after that many seconds and
+    returns None. The caller owns the task and must await or cancel it.
+    """
+    if timeout is None:
+        return asyncio.create_task(wait_random(max_delay))
+    return asyncio.create_task(wait_random_for(max_delay, timeout))
@@ -2,13 +2,58 @@
 """Asynchronous coroutine that returns and integer after a random delay"""
 
 import asyncio
-from typing import List
+from typing import List, Optional
 
-task_wait_random = __import__("3-tasks").task_wait_random
+tasks_module = __import__("3-tasks")
+task_wait_random = tasks_module.task_wait_random
+wait_random_for = tasks_module.wait_random_for
 
 
-async def task_wait_n(n: int, max_delay: int) -> List[float]:
-    """Spawn `wait_random` `n` times with the specified `max_delay`"""
-    tasks = [task_wait_random(max_delay) for _ in range(n)]
-    delay = [await task for task in asyncio.as_completed(tasks)]
-    return delay
+async def task_wait_n(n: int, max_delay: int,
+                      timeout: Optional[float] = None,
+                      deadline: Optional[float] = None) -> List[float]:
+    """Spawn `wait_random` `n` times with the specified `max_delay`
+
+    The tasks are scoped to this call: if one fails or the caller is
+    cancelled, the others are cancelled and awaited before the error
+    propagates, so nothing keeps running in the background. `timeout`
+    bounds each task, whose delay is then left out, and `deadline`
+    bounds the whole batch: once it passes the unfinished tasks are
+    cancelled and the delays gathered so far are returned. Delays come
+    in completion order.
+    """
+    delays: List[float] = []
+
+    def collect(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None \
+                and task.result() is not None:
+            delays.append(task.result())
+
+    if hasattr(asyncio, "TaskGroup"):
+        try:
+            async with asyncio.timeout(deadline):
+                async with asyncio.TaskGroup() as group:
+                    for _ in range(n):
+                        group.create_task(wait_random_for(
+                            max_delay, timeout)).add_done_callback(collect)
+        except TimeoutError:
+            pass
+        except BaseExceptionGroup as errors:
+            raise errors.exceptions[0] from errors
+        return delays
+
+    tasks = [task_wait_random(max_delay, timeout) for _ in range(n)]
+    for task in tasks:
+        task.add_done_callback(collect)
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=deadline,
+                                     return_when=asyncio.FIRST_EXCEPTION)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+    finally:
+        pending = [task for task in tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    return delays
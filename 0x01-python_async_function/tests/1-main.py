@@ -15,3 +15,17 @@ wait_n = __import__('1-concurrent_coroutines').wait_n
 print(asyncio.run(wait_n(5, 5)))
 print(asyncio.run(wait_n(10, 7)))
 print(asyncio.run(wait_n(10, 0)))
+print(asyncio.run(wait_n(10, 1, max_concurrency=3)))
+
+iter_wait_n = __import__('1-concurrent_coroutines').iter_wait_n
+
+
+async def first(k: int) -> list:
+    delays = []
+    async for delay in iter_wait_n(100000, 1, max_concurrency=100):
+        delays.append(delay)
+        if len(delays) == k:
+            break
+    return delays
+
+print(asyncio.run(first(3)))
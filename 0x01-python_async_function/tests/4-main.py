@@ -12,3 +12,15 @@ task_wait_n = __import__('4-tasks').task_wait_n
 n = 5
 max_delay = 6
 print(asyncio.run(task_wait_n(n, max_delay)))
+print(asyncio.run(task_wait_n(10, 4, timeout=2)))
+print(asyncio.run(task_wait_n(10, 4, deadline=2)))
+
+
+async def cancelled() -> int:
+    batch = asyncio.ensure_future(task_wait_n(1000, 10))
+    await asyncio.sleep(0.1)
+    batch.cancel()
+    await asyncio.gather(batch, return_exceptions=True)
+    return len(asyncio.all_tasks()) - 1
+
+print(asyncio.run(cancelled()))
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark `public_repos` filtering paths over large payloads.
+
+Compares, at 1k, 10k and 100k repos shaped like `fixtures.TEST_PAYLOAD`,
+the plain `has_license` scan, the license index of `GithubOrgClient` and
+the NumPy arrays of `RepoColumns`, each with its one-off build and per
+query cost, plus license counts and a star threshold.
+
+Usage: ./bench_columnar.py [rounds]
+"""
+import sys
+from collections import Counter
+
+from bench_json_decoders import best_of, make_repos
+from client import _LICENSE_KEY, GithubOrgClient, RepoColumns
+from utils import prime
+
+
+def main(rounds: int = 5, sizes=(1000, 10000, 100000)) -> None:
+    """Print filter times per path and payload size"""
+    for count in sizes:
+        json_payload = make_repos(count)
+        for i, repo in enumerate(json_payload):
+            repo["stargazers_count"] = i % 1000
+        client = GithubOrgClient("google")
+        prime(client, "repos_payload", json_payload)
+        columnar = GithubOrgClient("google", columnar=True)
+        prime(columnar, "repos_payload", json_payload)
+        columns = columnar.columns
+
+        def fresh(target):
+            def build():
+                target._indexes = None
+                return target.public_repos("apache-2.0")
+            return build
+
+        timings = [
+            ("scan", lambda: [
+                repo["name"] for repo in json_payload
+                if GithubOrgClient.has_license(repo, "apache-2.0")]),
+            ("index build+query", fresh(client)),
+            ("index query", lambda: client.public_repos("apache-2.0")),
+            ("columns build", lambda: RepoColumns(json_payload)),
+            ("columns build+query", fresh(columnar)),
+            ("columns query", lambda: columnar.public_repos("apache-2.0")),
+            ("scan license counts",
+             lambda: Counter(_LICENSE_KEY.many(json_payload))),
+            ("columns license counts", columns.license_counts),
+            ("scan min_stars", lambda: [
+                repo["name"] for repo in json_payload
+                if repo["stargazers_count"] >= 500]),
+            ("columns min_stars",
+             lambda: columns.public_repos(min_stars=500)),
+        ]
+        print("{} repos, best of {}".format(count, rounds))
+        baseline = None
+        for name, fn in timings:
+            elapsed = best_of(fn, rounds)
+            baseline = baseline or elapsed
+            print("  {:<24}{:>10.3f} ms {:>8.1f}x".format(
+                name, elapsed * 1e3, baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Benchmark the JSON decoders available to `utils.get_json`.
+
+Decodes a repos listing shaped like `fixtures.TEST_PAYLOAD`, scaled to
+10k repos, with every registered decoder, from the raw bytes and from
+the decoded text, next to `requests`' own `response.json()`.
+
+Usage: ./bench_json_decoders.py [repos] [rounds]
+"""
+import copy
+import gc
+import json
+import sys
+import time
+from typing import Callable, Dict, List
+
+import requests
+
+import utils
+from fixtures import TEST_PAYLOAD
+
+
+def make_repos(count: int) -> List[Dict]:
+    """Repos cycled from the fixtures with unique ids and names"""
+    template = TEST_PAYLOAD[0][1]
+    repos = []
+    for i in range(count):
+        repo = copy.deepcopy(template[i % len(template)])
+        repo["id"] = i
+        repo["name"] = "{}-{}".format(repo["name"], i)
+        repos.append(repo)
+    return repos
+
+
+def best_of(fn: Callable[[], object], rounds: int) -> float:
+    """Fastest of `rounds` timed calls of `fn`, in seconds, with the
+    garbage collector off as `timeit` does"""
+    best = float("inf")
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main(count: int = 10000, rounds: int = 5) -> None:
+    """Print decode times per backend"""
+    body = json.dumps(make_repos(count)).encode("utf-8")
+    text = body.decode("utf-8")
+    response = requests.models.Response()
+    response._content = body
+    response.encoding = "utf-8"
+
+    print("{} repos, {:.1f} MB, best of {}".format(
+        count, len(body) / 1e6, rounds))
+    baseline = best_of(response.json, rounds)
+    print("{:<24}{:>10.1f} ms".format("requests .json()", baseline * 1e3))
+    for name, loads in utils.json_decoders().items():
+        for source, data in (("bytes", body), ("str", text)):
+            elapsed = best_of(lambda: loads(data), rounds)
+            print("{:<24}{:>10.1f} ms {:>6.2f}x".format(
+                "{} ({})".format(name, source), elapsed * 1e3,
+                baseline / elapsed))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -1,58 +1,822 @@
 #!/usr/bin/env python3
 """A github org client
 """
+import asyncio
+import heapq
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
     List,
     Dict,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
 )
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from utils import (
+    BACKGROUND,
     get_json,
-    access_nested_map,
+    get_json_async,
+    get_json_page,
+    async_memoize,
+    compile_path,
+    compile_projection,
+    emit_metric,
+    invalidate,
     memoize,
+    metrics_enabled,
+    post_json,
+    prime,
+    request_priority,
+    run_in_background,
 )
 
+_LICENSE_KEY = compile_path(("license", "key"), default=None)
+
+
+class SyncResult(NamedTuple):
+    """Names of the repos touched by `GithubOrgClient.sync`
+    """
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+
+
+class RepoColumns:
+    """NumPy arrays over a repos payload
+
+    Built once per payload: `names`, license keys as categorical
+    `codes` into `licenses` (code 0 standing for no license), the
+    `fork` and `archived` flags and the `stars` and `forks` counts.
+    Filters are then boolean masks and counts a `bincount`, with no
+    per-repo Python work. Requires numpy.
+    """
+
+    def __init__(self, json_payload: Sequence[Dict]) -> None:
+        """Init method of RepoColumns"""
+        if numpy is None:
+            raise ImportError("RepoColumns requires numpy")
+        size = len(json_payload)
+        self.names = numpy.array([repo["name"] for repo in json_payload],
+                                 dtype=object)
+        codes = {None: 0}
+        self.codes = numpy.fromiter(
+            (codes.setdefault(key, len(codes))
+             for key in _LICENSE_KEY.many(json_payload)),
+            dtype=numpy.int32, count=size)
+        self.licenses = list(codes)
+        self._license_codes = codes
+
+        def column(field, dtype):
+            return numpy.fromiter(
+                (repo.get(field) or 0 for repo in json_payload),
+                dtype=dtype, count=size)
+
+        self.fork = column("fork", bool)
+        self.archived = column("archived", bool)
+        self.stars = column("stargazers_count", numpy.int64)
+        self.forks = column("forks_count", numpy.int64)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def mask(self, license: str = None, min_stars: int = None,
+             fork: bool = None, archived: bool = None) -> Any:
+        """Boolean array of the repos matching every given filter"""
+        mask = numpy.ones(len(self.names), dtype=bool)
+        if license is not None:
+            code = self._license_codes.get(license)
+            if code is None:
+                return numpy.zeros(len(self.names), dtype=bool)
+            mask &= self.codes == code
+        if min_stars is not None:
+            mask &= self.stars >= min_stars
+        if fork is not None:
+            mask &= self.fork == fork
+        if archived is not None:
+            mask &= self.archived == archived
+        return mask
+
+    def public_repos(self, license: str = None,
+                     **filters: Any) -> List[str]:
+        """Names of the repos matching the filters of `mask`"""
+        if license is None and not filters:
+            return self.names.tolist()
+        return self.names[self.mask(license, **filters)].tolist()
+
+    def license_counts(self, **filters: Any) -> Dict[str, int]:
+        """Number of repos per license key among those matching the
+        filters of `mask`"""
+        codes = self.codes[self.mask(**filters)] if filters else self.codes
+        counts = numpy.bincount(codes, minlength=len(self.licenses))
+        return {key: int(count)
+                for key, count in zip(self.licenses[1:], counts[1:])
+                if count}
+
+
+class GraphQLError(Exception):
+    """Error reported by a GraphQL endpoint
+    """
+
+
+_GRAPHQL_ORG = """
+  org{0}: organization(login: $login{0}) {{
+    login
+    name
+    description
+    url
+    repositories(first: $first, after: $after{0}, privacy: PUBLIC) {{
+      totalCount
+      pageInfo {{ hasNextPage endCursor }}
+      nodes {{ name licenseInfo {{ key }} }}
+    }}
+  }}"""
+
+
+class GraphQLTransport:
+    """Org and repos payloads through the GitHub GraphQL API
+
+    One query fetches the metadata and a page of repo names and license
+    keys of up to `batch_size` orgs, each under its own alias; orgs with
+    more repos are carried over to the next query with their cursor.
+    Results are shaped like the REST payloads `public_repos` and
+    `has_license` read: the org as a dict with "login", "name",
+    "description", "html_url" and "public_repos", and each repo as
+    `{"name": ..., "license": {"key": ...}}` or with a None license.
+    """
+    ENDPOINT = "https://api.github.com/graphql"
+
+    def __init__(self, endpoint: str = ENDPOINT, token: str = None,
+                 page_size: int = 100, batch_size: int = 20) -> None:
+        """Init method of GraphQLTransport"""
+        self.endpoint = endpoint
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self._headers = None
+        if token is not None:
+            self._headers = {"Authorization": "bearer {}".format(token)}
+
+    @staticmethod
+    def query(count: int) -> str:
+        """Query document for `count` aliased orgs"""
+        params = ", ".join("$login{0}: String!, $after{0}: String".format(i)
+                           for i in range(count))
+        return "query($first: Int!, {}) {{{}\n}}".format(
+            params, "".join(_GRAPHQL_ORG.format(i) for i in range(count)))
+
+    def fetch(self, org_name: str) -> Tuple[Dict, List[Dict]]:
+        """Org and repos payloads of one org"""
+        payloads, errors = self.fetch_many([org_name])
+        if org_name in errors:
+            raise errors[org_name]
+        return payloads[org_name]
+
+    def fetch_many(
+        self, org_names: Iterable[str],
+    ) -> Tuple[Dict[str, Tuple[Dict, List[Dict]]], Dict[str, Exception]]:
+        """Org and repos payloads by org, and the error of each org the
+        endpoint could not resolve or whose query failed"""
+        payloads, errors = {}, {}
+        cursors: Dict[str, Optional[str]] = dict.fromkeys(org_names)
+        while cursors:
+            batch = list(cursors)[:self.batch_size]
+            try:
+                data, messages = self._post(batch, cursors)
+            except Exception as exc:
+                for org_name in batch:
+                    errors[org_name] = exc
+                    payloads.pop(org_name, None)
+                    del cursors[org_name]
+                continue
+            for i, org_name in enumerate(batch):
+                alias = "org{}".format(i)
+                node = data.get(alias)
+                if node is None:
+                    errors[org_name] = GraphQLError(
+                        messages.get(alias)
+                        or "no data for {!r}".format(org_name))
+                    payloads.pop(org_name, None)
+                    del cursors[org_name]
+                    continue
+                repositories = node["repositories"]
+                if org_name not in payloads:
+                    payloads[org_name] = (self._org(node), [])
+                payloads[org_name][1].extend(
+                    self._repo(repo) for repo in repositories["nodes"])
+                page_info = repositories["pageInfo"]
+                if page_info["hasNextPage"]:
+                    cursors[org_name] = page_info["endCursor"]
+                else:
+                    del cursors[org_name]
+        return payloads, errors
+
+    def _post(self, batch: List[str], cursors: Dict[str, Optional[str]]
+              ) -> Tuple[Dict, Dict[Optional[str], str]]:
+        """Query the next page of every org of `batch`, returning the
+        data by alias and the error messages by alias"""
+        variables = {"first": self.page_size}
+        for i, org_name in enumerate(batch):
+            variables["login{}".format(i)] = org_name
+            variables["after{}".format(i)] = cursors[org_name]
+        response = post_json(self.endpoint, {
+            "query": self.query(len(batch)), "variables": variables,
+        }, self._headers)
+        messages = {}
+        for error in response.get("errors") or ():
+            alias = (error.get("path") or [None])[0]
+            messages.setdefault(alias, error.get("message"))
+        data = response.get("data")
+        if not data:
+            raise GraphQLError(next(iter(messages.values()), None)
+                               or response.get("message")
+                               or "no data in GraphQL response")
+        return data, messages
+
+    @staticmethod
+    def _org(node: Dict) -> Dict:
+        """REST-shaped org payload"""
+        return {
+            "login": node["login"],
+            "name": node.get("name"),
+            "description": node.get("description"),
+            "html_url": node.get("url"),
+            "public_repos": node["repositories"]["totalCount"],
+        }
+
+    @staticmethod
+    def _repo(node: Dict) -> Dict:
+        """REST-shaped repo payload"""
+        license_info = node.get("licenseInfo")
+        return {
+            "name": node["name"],
+            "license": None if license_info is None
+            else {"key": license_info["key"]},
+        }
+
 
 class GithubOrgClient:
     """A Githib org client
     """
     ORG_URL = "https://api.github.com/orgs/{org}"
+    shared_cache = None
+    snapshot_store = None
+    graphql = None
+    revalidation_errors = 0
+    _refreshing = set()
+    _refreshing_lock = threading.Lock()
+
+    def __init__(self, org_name: str, paginate: bool = False,
+                 fields: Sequence[str] = None,
+                 columnar: bool = False) -> None:
+        """Init method of GithubOrgClient
+
+        With `paginate`, repos listings follow `Link: rel="next"` headers
+        instead of stopping at the first page.
+
+        With `fields`, e.g. ("name", "license.key", "fork"), each repo of
+        `repos_payload` is kept as a slim `utils.Record` holding only
+        those dotted fields, plus "name".
+
+        With `columnar`, `public_repos` and `license_counts` run on
+        the NumPy arrays of `columns`, built once per payload; this pays
+        off for orgs with many thousands of repos and requires numpy.
+
+        Setting the `shared_cache` class attribute to a store such as
+        `utils.MemoryStore` or `utils.DirectoryStore` shares org and
+        repos payloads between every instance of the process (or of
+        every process, for a directory store).
+
+        Setting the `snapshot_store` class attribute to a
+        `utils.SnapshotStore` persists payloads across restarts: a new
+        process serves the snapshot at once and refreshes an expired
+        one in the background. Failed refreshes are counted in the
+        `revalidation_errors` class attribute and retried on the next
+        read.
+
+        Setting the `graphql` class attribute to a `GraphQLTransport`
+        fetches the org and its repo names and licenses together over
+        GraphQL instead of the two REST round trips.
 
-    def __init__(self, org_name: str) -> None:
-        """Init method of GithubOrgClient"""
+        Once a metrics sink is installed with `utils.add_metrics_sink`,
+        lookups report client_cache_total{name, source} and
+        `public_repos` reports public_repos_filter_seconds.
+        """
         self._org_name = org_name
+        self._paginate = paginate
+        if columnar and numpy is None:
+            raise ImportError("columnar GithubOrgClient requires numpy")
+        self._columnar = columnar
+        self._fields = None
+        self._project = None
+        if fields is not None:
+            self._fields = tuple(dict.fromkeys(("name",) + tuple(fields)))
+            self._project = compile_projection(self._fields)
 
-    @memoize
+    @memoize(single_flight=True)
     def org(self) -> Dict:
         """Memoize org"""
-        return get_json(self.ORG_URL.format(org=self._org_name))
+        if self.graphql is not None:
+            key = "org:graphql:{}".format(self._org_name)
+
+            def fetch():
+                return self._graphql_payloads[0]
+        else:
+            key = "org:{}".format(self._org_name)
+
+            def fetch():
+                return get_json(self.ORG_URL.format(org=self._org_name))
+        return self._shared("org", key, fetch)
+
+    @memoize(single_flight=True)
+    def _graphql_payloads(self) -> Tuple[Dict, List[Dict]]:
+        """Memoize org and repos payloads fetched over GraphQL"""
+        return self.graphql.fetch(self._org_name)
 
     @property
     def _public_repos_url(self) -> str:
         """Public repos URL"""
+        if self.graphql is not None:
+            raise RuntimeError(
+                "{} lists repos over GraphQL and has no REST repos "
+                "URL; set graphql to None to use REST".format(
+                    type(self).__name__))
         return self.org["repos_url"]
 
-    @memoize
+    @memoize(single_flight=True)
     def repos_payload(self) -> Dict:
         """Memoize repos payload"""
-        return get_json(self._public_repos_url)
+        project = self._project
+        if self.graphql is not None:
+            key = self._repos_key("graphql:{}".format(self._org_name))
+
+            def fetch():
+                repos = self._graphql_payloads[1]
+                if project is not None:
+                    return [project(repo) for repo in repos]
+                return repos
+            return self._shared("repos_payload", key, fetch)
+
+        url = self._public_repos_url
+        key = self._repos_key(url)
+
+        def fetch():
+            repos = self._walk_repos(url) if self._paginate \
+                else get_json(url)
+            if project is not None:
+                return [project(repo) for repo in repos]
+            return list(repos) if self._paginate else repos
+
+        return self._shared("repos_payload", key, fetch)
+
+    def _repos_key(self, url: str) -> str:
+        """Shared cache key of the repos payload"""
+        key = "repos:{}".format(url)
+        if self._fields is not None:
+            key = "{}|{}".format(key, ",".join(self._fields))
+        return key
+
+    def _shared(self, name: str, key: str, fetch: Callable[[], Any]) -> Any:
+        """Look `key` up in the shared cache then in the snapshots,
+        fetching it on a miss"""
+        cache = self.shared_cache
+        value = None if cache is None else cache.get(key)
+        if value is not None:
+            if metrics_enabled():
+                emit_metric("client_cache_total", 1, name=name,
+                            source="shared")
+            return value
+        snapshots = self.snapshot_store
+        snapshot = None if snapshots is None else snapshots.load(key)
+        if metrics_enabled():
+            emit_metric("client_cache_total", 1, name=name,
+                        source="fetch" if snapshot is None else "snapshot")
+        if snapshot is None:
+            value = fetch()
+            if snapshots is not None:
+                snapshots.save(key, value)
+        else:
+            value = snapshot.value
+            if snapshot.expired:
+                self._revalidate(name, key, fetch)
+        if cache is not None:
+            cache.set(key, value)
+        return value
+
+    def _revalidate(self, name: str, key: str,
+                    fetch: Callable[[], Any]) -> None:
+        """Refresh an expired snapshot on a background thread, at
+        background priority"""
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                try:
+                    with request_priority(BACKGROUND):
+                        value = fetch()
+                except Exception:
+                    with self._refreshing_lock:
+                        GithubOrgClient.revalidation_errors += 1
+                    # Drop the stale value once memoized, so the next
+                    # read serves the snapshot again and retries.
+                    getattr(self, name)
+                    invalidate(self, name)
+                    return
+                # Wait for the lookup that served the stale snapshot to
+                # memoize it, so it cannot overwrite the fresh value.
+                getattr(self, name)
+                self.snapshot_store.save(key, value)
+                if self.shared_cache is not None:
+                    self.shared_cache.set(key, value)
+                prime(self, name, value)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        run_in_background(refresh)
+
+    def _iter_repos(self) -> Iterator[Dict]:
+        """Yield repos page by page, holding one page at a time"""
+        if self.graphql is not None or (
+                self._paginate and hasattr(self, "_repos_payload")):
+            yield from self.repos_payload
+            return
+        yield from self._walk_repos(self._public_repos_url)
+
+    @staticmethod
+    def _walk_repos(url: str) -> Iterator[Dict]:
+        """Yield the repos of every page of the listing at `url`"""
+        while url:
+            page, url = get_json_page(url)
+            yield from page
+
+    def iter_public_repos(self, license: str = None) -> Iterator[str]:
+        """Public repos, yielded as each page arrives"""
+        for repo in self._iter_repos():
+            if license is None or self.has_license(repo, license):
+                yield repo["name"]
 
     def public_repos(self, license: str = None) -> List[str]:
         """Public repos"""
         json_payload = self.repos_payload
-        public_repos = [
-            repo["name"] for repo in json_payload
-            if license is None or self.has_license(repo, license)
-        ]
+        start = time.perf_counter() if metrics_enabled() else None
+        if self._columnar:
+            public_repos = self.columns.public_repos(license)
+        elif license is None:
+            public_repos = [repo["name"] for repo in json_payload]
+        else:
+            positions = self._index(_LICENSE_KEY.path).get(license, ())
+            public_repos = [json_payload[i]["name"] for i in positions]
+        if start is not None:
+            emit_metric("public_repos_filter_seconds",
+                        time.perf_counter() - start)
 
         return public_repos
 
+    def license_counts(self) -> Dict[str, int]:
+        """Number of public repos per license key"""
+        if self._columnar:
+            return self.columns.license_counts()
+        index = self._index(_LICENSE_KEY.path)
+        return {key: len(positions) for key, positions in index.items()
+                if key is not None}
+
+    def query(self, fields: Sequence[str] = ("name",),
+              order_by: str = None, limit: int = None,
+              min_stars: int = None, **filters: Any) -> List[Dict]:
+        """Select repos matching every filter
+
+        `filters` compare a field for equality, `license` standing for
+        `license.key` and dotted names for nested fields. `order_by`
+        sorts on a field, descending when prefixed with "-". Each repo
+        is returned as a dict of the requested `fields`, e.g.
+        `query(license="apache-2.0", fork=False, min_stars=100,
+        order_by="-stargazers_count", limit=20)`.
+        """
+        size = len(self.repos_payload)
+        selections = [self._select(self._path(field), value)
+                      for field, value in filters.items()]
+        if min_stars is not None:
+            values, positions = self._sorted(("stargazers_count",))
+            selections.append(positions[bisect_left(values, min_stars):])
+        if selections:
+            selections.sort(key=len)
+            matches = set(selections[0])
+            for selection in selections[1:]:
+                matches.intersection_update(selection)
+        else:
+            matches = range(size)
+
+        if order_by is None:
+            positions = sorted(matches)[:limit]
+        else:
+            column = self._column(self._path(order_by.lstrip("-")))
+            if order_by.startswith("-"):
+                def key(i):
+                    return column[i] is not None, column[i]
+                select = heapq.nlargest
+            else:
+                def key(i):
+                    return column[i] is None, column[i]
+                select = heapq.nsmallest
+            positions = (select(limit, matches, key=key)
+                         if limit is not None
+                         else sorted(matches, key=key,
+                                     reverse=select is heapq.nlargest))
+
+        columns = [(field, self._column(self._path(field)))
+                   for field in fields]
+        return [{field: column[i] for field, column in columns}
+                for i in positions]
+
+    @property
+    def columns(self) -> RepoColumns:
+        """`RepoColumns` of repos_payload, rebuilt with the payload"""
+        return self._derived("columns", (), RepoColumns)
+
+    @staticmethod
+    def _path(field: str) -> Tuple:
+        """Key path of a query field"""
+        return _LICENSE_KEY.path if field == "license" \
+            else tuple(field.split("."))
+
+    def _derived(self, kind: str, path: Tuple,
+                 build: Callable[[List[Dict]], Any]) -> Any:
+        """Per-payload cache of columns and indexes"""
+        json_payload = self.repos_payload
+        cache = getattr(self, "_indexes", None)
+        if cache is None or cache[0] is not json_payload:
+            cache = self._indexes = (json_payload, {})
+        value = cache[1].get((kind, path))
+        if value is None:
+            value = cache[1][(kind, path)] = build(json_payload)
+        return value
+
+    def _column(self, path: Tuple) -> List[Any]:
+        """Value at `path` of every repo, None when missing"""
+        return self._derived("column", path,
+                             compile_path(path, default=None).many)
+
+    def _index(self, path: Tuple) -> Dict[Any, List[int]]:
+        """Repo positions by value at `path`, rebuilt with the payload"""
+        def build(json_payload):
+            index = {}
+            for position, value in enumerate(self._column(path)):
+                index.setdefault(value, []).append(position)
+            return index
+        return self._derived("index", path, build)
+
+    def _select(self, path: Tuple, value: Any) -> Sequence[int]:
+        """Positions of the repos whose value at `path` equals `value`
+
+        Lists and dicts cannot key the index, so filters on them scan
+        the column instead.
+        """
+        try:
+            return self._index(path).get(value, ())
+        except TypeError:
+            return [position for position, other
+                    in enumerate(self._column(path)) if other == value]
+
+    def _sorted(self, path: Tuple) -> Tuple[List[Any], List[int]]:
+        """Non-None values at `path` in ascending order, with positions"""
+        def build(json_payload):
+            pairs = sorted((value, position) for position, value
+                           in enumerate(self._column(path))
+                           if value is not None)
+            return [v for v, _ in pairs], [p for _, p in pairs]
+        return self._derived("sorted", path, build)
+
+    def sync(self, full: bool = False) -> SyncResult:
+        """Merge repos updated since the last sync into repos_payload
+
+        Repos are listed by descending `updated_at` and the listing
+        stops at the newest `updated_at` already known, so the cost
+        follows the churn. Removed repos can only be seen by a `full`
+        sync, which lists everything; the first sync is always full,
+        even over a repos_payload already loaded otherwise, since that
+        may be a single page. Indexes built on the payload are patched
+        rather than rebuilt. Syncs list repos over REST, so a client with
+        the GraphQL transport raises `RuntimeError`.
+        """
+        if self.graphql is not None:
+            raise RuntimeError(
+                "sync() lists repos over REST and cannot run while "
+                "{}.graphql is set".format(type(self).__name__))
+        old = getattr(self, "_repos_payload", None) or []
+        watermark = None if full else getattr(self, "_sync_watermark", None)
+        full = watermark is None
+        url = self._public_repos_url
+        listing = "{}{}sort=updated&direction=desc&per_page=100".format(
+            url, "&" if "?" in url else "?")
+
+        fetched, newest = [], watermark
+        while listing:
+            page, listing = get_json_page(listing)
+            for repo in page:
+                updated_at = repo.get("updated_at") or ""
+                if watermark is not None and updated_at < watermark:
+                    listing = None
+                    break
+                if updated_at and (newest is None or updated_at > newest):
+                    newest = updated_at
+                fetched.append(repo if self._project is None
+                               else self._project(repo))
+
+        json_payload = list(old)
+        positions = {repo["name"]: i for i, repo in enumerate(old)}
+        added, changed, updates = [], [], {}
+        for repo in fetched:
+            position = positions.get(repo["name"])
+            if position is None:
+                position = positions[repo["name"]] = len(json_payload)
+                json_payload.append(repo)
+                added.append(repo["name"])
+            elif json_payload[position] != repo:
+                json_payload[position] = repo
+                if position < len(old):
+                    changed.append(repo["name"])
+            else:
+                continue
+            updates[position] = repo
+
+        removed = []
+        if full and old:
+            seen = {repo["name"] for repo in fetched}
+            removed = [repo["name"] for repo in old
+                       if repo["name"] not in seen]
+        if removed:
+            json_payload = [repo for repo in json_payload
+                            if repo["name"] in seen]
+        elif updates:
+            self._patch_derived(old, json_payload, updates)
+
+        self._sync_watermark = newest
+        if added or changed or removed or not hasattr(self,
+                                                      "_repos_payload"):
+            prime(self, "repos_payload", json_payload)
+            key = self._repos_key(url)
+            if self.shared_cache is not None:
+                self.shared_cache.set(key, json_payload)
+            if self.snapshot_store is not None:
+                self.snapshot_store.save(key, json_payload)
+        return SyncResult(added, changed, removed)
+
+    def _patch_derived(self, old: List[Dict], json_payload: List[Dict],
+                       updates: Dict[int, Dict]) -> None:
+        """Carry columns and indexes of `old` over to `json_payload`"""
+        cache = getattr(self, "_indexes", None)
+        if cache is None or cache[0] is not old:
+            return
+        derived = {}
+        for (kind, path), column in cache[1].items():
+            if kind != "column":
+                continue
+            values = compile_path(path, default=None)
+            column = column + [None] * (len(json_payload) - len(old))
+            index = cache[1].get(("index", path))
+            if index is not None:
+                index = dict(index)
+            for position, repo in updates.items():
+                value = values(repo)
+                if index is not None:
+                    if position < len(old):
+                        previous = index[column[position]] = list(
+                            index[column[position]])
+                        previous.remove(position)
+                    target = index[value] = list(index.get(value, ()))
+                    insort(target, position)
+                column[position] = value
+            derived[("column", path)] = column
+            if index is not None:
+                derived[("index", path)] = {
+                    key: positions for key, positions in index.items()
+                    if positions}
+        self._indexes = (json_payload, derived)
+
     @staticmethod
     def has_license(repo: Dict[str, Dict], license_key: str) -> bool:
         """Static: has_license"""
         assert license_key is not None, "license_key cannot be None"
-        try:
-            has_license = access_nested_map(repo, ("license", "key")) == license_key
-        except KeyError:
-            return False
-        return has_license
+        return _LICENSE_KEY(repo) == license_key
+
+
+class BulkGithubOrgClient:
+    """A Github org client for many orgs at once
+    """
+
+    def __init__(self, org_names: Iterable[str], **options: Any) -> None:
+        """Init method of BulkGithubOrgClient
+
+        One `GithubOrgClient` is kept per distinct org name, built with
+        `options`, so memoized payloads survive between calls.
+        """
+        self._clients = {org_name: GithubOrgClient(org_name, **options)
+                         for org_name in org_names}
+
+    def public_repos(
+        self, license: str = None, max_concurrency: int = 16,
+    ) -> Tuple[Dict[str, List[str]], Dict[str, Exception]]:
+        """Public repos of every org, fetched concurrently
+
+        Each worker runs the `org` then repos round trips of one org, so
+        up to `max_concurrency` orgs are in flight at different stages.
+        With `GithubOrgClient.graphql` set, every org is instead fetched
+        by batched GraphQL queries before the workers start.
+        Returns the repo names by org and the exception raised by each
+        org that failed.
+        """
+        results, errors = {}, {}
+        clients = self._clients
+        transport = GithubOrgClient.graphql
+        if transport is not None:
+            pending = [org_name for org_name, client in clients.items()
+                       if not hasattr(client, "__graphql_payloads")]
+            payloads, errors = transport.fetch_many(pending)
+            for org_name, payload in payloads.items():
+                prime(clients[org_name], "_graphql_payloads", payload)
+            clients = {org_name: client
+                       for org_name, client in clients.items()
+                       if org_name not in errors}
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {
+                org_name: executor.submit(client.public_repos, license)
+                for org_name, client in clients.items()
+            }
+            for org_name, future in futures.items():
+                try:
+                    results[org_name] = future.result()
+                except Exception as exc:
+                    errors[org_name] = exc
+        return results, errors
+
+
+class AsyncGithubOrgClient:
+    """An asyncio Github org client
+    """
+    ORG_URL = GithubOrgClient.ORG_URL
+    MAX_CONCURRENCY = 100
+    _semaphores = weakref.WeakKeyDictionary()
+
+    def __init__(self, org_name: str, session: Any = None,
+                 semaphore: asyncio.Semaphore = None) -> None:
+        """Init method of AsyncGithubOrgClient
+
+        `session` is an optional aiohttp.ClientSession, `semaphore`
+        bounds in-flight requests and defaults to one shared by every
+        client running on the same event loop.
+        """
+        self._org_name = org_name
+        self._session = session
+        self._semaphore = semaphore
+
+    async def _get_json(self, url: str) -> Any:
+        """Fetch `url` while holding the concurrency semaphore"""
+        semaphore = self._semaphore
+        if semaphore is None:
+            loop = asyncio.get_running_loop()
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+                self._semaphores[loop] = semaphore
+        async with semaphore:
+            return await get_json_async(url, self._session)
+
+    @async_memoize
+    async def org(self) -> Dict:
+        """Memoize org"""
+        return await self._get_json(self.ORG_URL.format(org=self._org_name))
+
+    async def _public_repos_url(self) -> str:
+        """Public repos URL"""
+        return (await self.org())["repos_url"]
+
+    @async_memoize
+    async def repos_payload(self) -> List[Dict]:
+        """Memoize repos payload"""
+        return await self._get_json(await self._public_repos_url())
+
+    async def public_repos(self, license: str = None) -> List[str]:
+        """Public repos"""
+        json_payload = await self.repos_payload()
+        return [
+            repo["name"] for repo in json_payload
+            if license is None or self.has_license(repo, license)
+        ]
+
+    has_license = staticmethod(GithubOrgClient.has_license)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Load-test `GithubOrgClient` and `get_json` against the mock server.
+
+Starts a `MockGithubServer`, then has `--workers` threads run
+`--requests` operations between them and reports throughput and
+latency percentiles. Nothing leaves the machine.
+
+Usage: ./load_test.py [--mode client|get_json] [--workers N]
+                      [--requests N] [--repos N] [--per-page N]
+                      [--latency SECONDS] [--pooled] [--graphql]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence
+
+import utils
+from client import GithubOrgClient, GraphQLTransport
+from mock_github_server import MockGithubServer
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted `samples`"""
+    if not samples:
+        return float("nan")
+    rank = min(int(fraction * len(samples)), len(samples) - 1)
+    return samples[rank]
+
+
+def run(operation: Callable[[], object], workers: int,
+        requests: int) -> Dict[str, float]:
+    """Run `operation` `requests` times over `workers` threads"""
+    def timed(_):
+        start = time.perf_counter()
+        operation()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies: List[float] = sorted(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "seconds": elapsed,
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 0.50),
+        "p90": percentile(latencies, 0.90),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1],
+    }
+
+
+def main() -> None:
+    """Parse arguments, serve, load and report"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("client", "get_json"),
+                        default="client")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--repos", type=int, default=300)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--pooled", action="store_true",
+                        help="reuse connections through configure_session")
+    parser.add_argument("--graphql", action="store_true",
+                        help="fetch clients through GraphQLTransport")
+    args = parser.parse_args()
+
+    with MockGithubServer(orgs={"google": args.repos},
+                          per_page=args.per_page,
+                          latency=args.latency) as server:
+        if args.pooled:
+            utils.configure_session(pool_maxsize=args.workers)
+
+        class Client(GithubOrgClient):
+            ORG_URL = server.org_url()
+            graphql = GraphQLTransport(server.url + "/graphql") \
+                if args.graphql else None
+
+        if args.mode == "client":
+            def operation():
+                Client("google", paginate=True).public_repos("apache-2.0")
+        else:
+            url = server.url + "/orgs/google/repos"
+
+            def operation():
+                utils.get_json(url)
+
+        try:
+            report = run(operation, args.workers, args.requests)
+        finally:
+            utils.close_session()
+        report["round_trips"] = server.requests / args.requests
+        report["kib"] = server.bytes_sent / args.requests / 1024
+
+    print("{mode}: {requests} ops, {workers} workers, {repos} repos, "
+          "{latency:g}s latency{}{}".format(
+              ", pooled" if args.pooled else "",
+              ", graphql" if args.graphql else "", **vars(args)))
+    print("  {requests} ops in {seconds:.2f}s = {throughput:.1f} ops/s"
+          .format(**report))
+    print("  per op: {round_trips:.1f} round trips, {kib:.1f} KiB"
+          .format(**report))
+    print("  latency ms: p50 {:.2f}  p90 {:.2f}  p99 {:.2f}  max {:.2f}"
+          .format(*(report[key] * 1000
+                    for key in ("p50", "p90", "p99", "max"))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""A local stand-in for the GitHub REST API.
+
+Serves synthetic org and repos payloads shaped like
+`fixtures.TEST_PAYLOAD` so `GithubOrgClient` and `get_json` can be
+exercised end-to-end over real sockets: pagination through Link
+headers, ETag / If-None-Match, rate-limit headers and added latency
+are all configurable. POST /graphql answers the aliased organization
+queries sent by `client.GraphQLTransport`.
+
+Usage: ./mock_github_server.py [port]
+"""
+import base64
+import copy
+import hashlib
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from fixtures import TEST_PAYLOAD
+
+
+def synthetic_repos(org: str, count: int) -> List[Dict]:
+    """`count` repos cycled from the fixtures with unique ids, names and
+    decreasing `updated_at`"""
+    template = TEST_PAYLOAD[0][1]
+    repos = []
+    for i in range(count):
+        repo = copy.deepcopy(template[i % len(template)])
+        repo["id"] = i
+        repo["name"] = "{}-{}".format(repo["name"], i)
+        repo["full_name"] = "{}/{}".format(org, repo["name"])
+        repo["owner"]["login"] = org
+        repo["updated_at"] = time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(1.7e9 - i * 60))
+        repos.append(repo)
+    return repos
+
+
+class MockGithubServer:
+    """Threaded HTTP server answering like api.github.com
+
+    `orgs` maps org names to their number of repos. `per_page` is the
+    default page size, `latency` seconds are slept before each answer,
+    and `rate_limit` requests are allowed per `window` seconds before
+    answers turn into 403 with Retry-After.
+    """
+
+    def __init__(self, orgs: Dict[str, int] = None, per_page: int = 30,
+                 latency: float = 0.0, rate_limit: Optional[int] = None,
+                 window: float = 3600, port: int = 0) -> None:
+        """Init method of MockGithubServer"""
+        self.per_page = per_page
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.window = window
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._used = 0
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self.url = "http://127.0.0.1:{}".format(self._httpd.server_port)
+        self.repos = {org: synthetic_repos(org, count)
+                      for org, count in (orgs or {"google": 100}).items()}
+        self._thread = None
+
+    def start(self) -> "MockGithubServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockGithubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def org_url(self) -> str:
+        """`GithubOrgClient.ORG_URL` template pointing at this server"""
+        return self.url + "/orgs/{org}"
+
+    def _take(self) -> Tuple[bool, Dict[str, str]]:
+        """Count a request against the rate limit"""
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit is None:
+                return True, {}
+            now = time.time()
+            if now - self._window_start >= self.window:
+                self._window_start, self._used = now, 0
+            reset = self._window_start + self.window
+            allowed = self._used < self.rate_limit
+            self._used += allowed
+            headers = {
+                "X-RateLimit-Limit": str(self.rate_limit),
+                "X-RateLimit-Remaining": str(self.rate_limit - self._used),
+                "X-RateLimit-Reset": str(int(reset)),
+            }
+            if not allowed:
+                headers["Retry-After"] = str(max(int(reset - now), 1))
+            return allowed, headers
+
+    def route(self, path: str, query: Dict[str, List[str]]
+              ) -> Tuple[int, object, Dict[str, str]]:
+        """Status, JSON body and extra headers for a GET"""
+        match = re.fullmatch(r"/orgs/([^/]+)(/repos)?", path)
+        if match is None or match.group(1) not in self.repos:
+            return 404, {"message": "Not Found"}, {}
+        org, repos_path = match.groups()
+        repos = self.repos[org]
+        if repos_path is None:
+            return 200, {
+                "login": org,
+                "repos_url": "{}/orgs/{}/repos".format(self.url, org),
+                "public_repos": len(repos),
+            }, {}
+
+        if query.get("sort") == ["updated"]:
+            repos = sorted(repos, key=lambda repo: repo["updated_at"],
+                           reverse=query.get("direction") != ["asc"])
+        per_page = min(int(query.get("per_page", [self.per_page])[0]), 100)
+        page = int(query.get("page", ["1"])[0])
+        last = max((len(repos) + per_page - 1) // per_page, 1)
+        links = []
+        for rel, number in (("next", page + 1), ("last", last)):
+            if number <= last and (rel == "last" or page < last):
+                params = {key: values[0] for key, values in query.items()}
+                params.update(page=str(number), per_page=str(per_page))
+                links.append('<{}/orgs/{}/repos?{}>; rel="{}"'.format(
+                    self.url, org, "&".join(
+                        "{}={}".format(*item) for item in params.items()),
+                    rel))
+        headers = {"Link": ", ".join(links)} if links else {}
+        start = (page - 1) * per_page
+        return 200, repos[start:start + per_page], headers
+
+    _GRAPHQL_ORG = re.compile(
+        r"(\w+): organization\(login: \$(\w+)\).*?"
+        r"repositories\(first: \$(\w+), after: \$(\w+)", re.S)
+
+    def graphql(self, query: str, variables: Dict) -> Dict:
+        """Answer the aliased organization queries of `query`, reading
+        logins, page sizes and cursors from `variables`"""
+        data, errors = {}, []
+        for alias, login, first, after in self._GRAPHQL_ORG.findall(query):
+            org = variables.get(login)
+            if org not in self.repos:
+                data[alias] = None
+                errors.append({
+                    "type": "NOT_FOUND", "path": [alias],
+                    "message": "Could not resolve to an Organization with "
+                               "the login of '{}'.".format(org),
+                })
+                continue
+            repos = self.repos[org]
+            cursor = variables.get(after)
+            start = 0 if cursor is None else int(
+                base64.b64decode(cursor).decode().split(":")[1])
+            end = min(start + min(variables[first], 100), len(repos))
+            data[alias] = {
+                "login": org,
+                "name": org.capitalize(),
+                "description": None,
+                "url": "https://github.com/{}".format(org),
+                "repositories": {
+                    "totalCount": len(repos),
+                    "pageInfo": {
+                        "hasNextPage": end < len(repos),
+                        "endCursor": base64.b64encode("cursor:{}".format(
+                            end).encode()).decode(),
+                    },
+                    "nodes": [{
+                        "name": repo["name"],
+                        "licenseInfo": None if repo.get("license") is None
+                        else {"key": repo["license"]["key"]},
+                    } for repo in repos[start:end]],
+                },
+            }
+        answer = {"data": data}
+        if errors:
+            answer["errors"] = errors
+        return answer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler of MockGithubServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Answer a REST GET"""
+        mock = self.server.mock
+        if mock.latency:
+            time.sleep(mock.latency)
+        allowed, headers = mock._take()
+        if not allowed:
+            self._send(403, {"message": "API rate limit exceeded"}, headers)
+            return
+        url = urlsplit(self.path)
+        status, payload, extra = mock.route(url.path, parse_qs(url.query))
+        headers.update(extra)
+        self._send(status, payload, headers)
+
+    def do_POST(self):
+        """Answer a GraphQL POST"""
+        mock = self.server.mock
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if mock.latency:
+            time.sleep(mock.latency)
+        allowed, headers = mock._take()
+        if not allowed:
+            self._send(403, {"message": "API rate limit exceeded"}, headers)
+        elif urlsplit(self.path).path != "/graphql":
+            self._send(404, {"message": "Not Found"}, headers)
+        else:
+            request = json.loads(body)
+            self._send(200, mock.graphql(
+                request["query"], request.get("variables") or {}), headers)
+
+    def _send(self, status, payload, headers):
+        """Write a JSON answer, or 304 when the ETag matches"""
+        body = json.dumps(payload).encode("utf-8")
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            with self.server.mock._lock:
+                self.server.mock.not_modified += 1
+            status, body = 304, b""
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status in (200, 304):
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.mock._lock:
+            self.server.mock.bytes_sent += len(body)
+
+    def log_message(self, *args):
+        """Silence request logging"""
+
+
+if __name__ == "__main__":
+    server = MockGithubServer(port=int(sys.argv[1]) if len(sys.argv) > 1
+                              else 8000)
+    print("Serving {} (orgs: {})".format(server.url, ", ".join(server.repos)))
+    server._httpd.serve_forever()
@@ -14,13 +14,69 @@ Test Classes:
 2. 'TestIntegrationGithubOrgClient': Integration test case class
 for 'GithubOrgClient'.
    - Tests cover the 'public_repos' method with different payloads.
+
+3. 'TestAsyncGithubOrgClient': Unit test case class
+for 'AsyncGithubOrgClient'.
+   - Tests awaitable lookups and the concurrency bound.
+
+4. 'TestPagination': Unit test case class for paginated listings.
+   - Tests 'iter_public_repos' and paginated 'repos_payload'.
+
+5. 'TestSharedCache': Unit test case class for the process-wide cache.
+   - Tests that instances for the same org share one fetch.
+
+6. 'TestLicenseIndex': Unit test case class for the license index.
+   - Tests index lookups, 'license_counts' and rebuilds on refresh.
+
+7. 'TestQuery': Unit test case class for 'query'.
+   - Tests combined filters, ordering and limits against a plain scan.
+
+8. 'TestProjection': Unit test case class for projected repo records.
+   - Tests that slim records answer the same queries as full dicts.
+
+9. 'TestBulkGithubOrgClient': Unit test case class for
+'BulkGithubOrgClient'.
+   - Tests per-org results and errors and the concurrency bound.
+
+10. 'TestSnapshotStore': Unit test case class for warm starts.
+   - Tests serving from snapshots and background revalidation.
+
+11. 'TestSync': Unit test case class for incremental syncs.
+   - Tests delta listings, full listings and patched indexes.
+
+12. 'TestMockGithubServer': Integration test case class against
+'MockGithubServer' over real sockets.
+   - Tests paginated listings, conditional requests, metrics and rate
+   limits.
+
+13. 'TestGraphQLTransport': Integration test case class for the GraphQL
+transport against 'MockGithubServer'.
+   - Tests batched queries, pagination, shaping and per-org errors.
+
+14. 'TestRepoColumns': Unit test case class for the columnar backend.
+   - Tests parity of masks, counts and thresholds with the dict paths.
 """
 
+import asyncio
+import copy
+import tempfile
+import threading
+import time
 import unittest
+import requests
 from parameterized import parameterized, parameterized_class
 from unittest.mock import patch, PropertyMock
-from client import GithubOrgClient
+import client
+from client import (
+    AsyncGithubOrgClient, BulkGithubOrgClient, GithubOrgClient,
+    GraphQLError, GraphQLTransport, RepoColumns,
+)
+import utils
+from utils import (
+    MemoryStore, MetricsRegistry, RateLimiter, SnapshotStore, invalidate,
+)
 from fixtures import TEST_PAYLOAD
+from mock_github_server import MockGithubServer
 
 
 class TestGithubOrgClient(unittest.TestCase):
@@ -209,3 +265,922 @@ class TestIntegrationGithubOrgClient(unittest.TestCase):
         self.assertEqual(client.public_repos("apache-2.0"),
                          self.apache2_repos)
         self.mock.assert_called()
+
+
+class FixtureMixin:
+    """
+    Serves the first TEST_PAYLOAD fixture in place of the GitHub API.
+    """
+
+    org_payload, repos_payload, expected_repos, apache2_repos = \
+        TEST_PAYLOAD[0]
+
+    def serve(self, url):
+        """Fresh repos list for the org's repos URL, else the org."""
+        if url == self.org_payload["repos_url"]:
+            return list(self.repos_payload)
+        return self.org_payload
+
+    def patch_get_json(self, fake=None):
+        """Patch 'client.get_json' with 'fake', 'serve' by default."""
+        patcher = patch("client.get_json", side_effect=fake or self.serve)
+        mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        return mock
+
+
+class TestAsyncGithubOrgClient(FixtureMixin,
+                               unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for the AsyncGithubOrgClient class.
+
+    'get_json_async' is replaced by a coroutine serving the first
+    TEST_PAYLOAD fixture so no network access happens.
+    """
+
+    async def fake_get_json(self, url, session=None):
+        """Serve fixtures and track how many calls overlap."""
+        self.calls.append(url)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0)
+        self.active -= 1
+        return self.serve(url)
+
+    def setUp(self):
+        """Patch 'client.get_json_async' with 'fake_get_json'."""
+        self.calls, self.active, self.peak = [], 0, 0
+        patcher = patch("client.get_json_async", self.fake_get_json)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_public_repos(self):
+        """
+        Test awaitable 'org', 'repos_payload' and 'public_repos'.
+        """
+        client = AsyncGithubOrgClient("google")
+        self.assertEqual(await client.org(), self.org_payload)
+        self.assertEqual(await client.public_repos(), self.expected_repos)
+        self.assertEqual(await client.public_repos("apache-2.0"),
+                         self.apache2_repos)
+        self.assertEqual(self.calls, [
+            "https://api.github.com/orgs/google",
+            self.org_payload["repos_url"],
+        ])
+
+    async def test_concurrency_bound(self):
+        """
+        Test that a shared semaphore bounds in-flight requests.
+        """
+        semaphore = asyncio.Semaphore(3)
+        clients = [AsyncGithubOrgClient("org{}".format(i),
+                                        semaphore=semaphore)
+                   for i in range(50)]
+        results = await asyncio.gather(*(c.public_repos() for c in clients))
+        self.assertEqual(results, [self.expected_repos] * 50)
+        self.assertEqual(len(self.calls), 100)
+        self.assertLessEqual(self.peak, 3)
+
+
+class TestPagination(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for paginated repos listings of GithubOrgClient.
+
+    The first TEST_PAYLOAD fixture is split in pages of three repos
+    linked together through their next URL.
+    """
+
+    def setUp(self):
+        """Patch 'get_json_page' to serve the fixture in pages."""
+        repos_url = self.org_payload["repos_url"]
+        self.pages = {}
+        for i in range(0, len(self.repos_payload), 3):
+            url = repos_url if i == 0 else "{}?page={}".format(repos_url, i)
+            more = i + 3 < len(self.repos_payload)
+            self.pages[url] = (self.repos_payload[i:i + 3],
+                               "{}?page={}".format(repos_url, i + 3)
+                               if more else None)
+        org_patcher = patch("client.GithubOrgClient.org",
+                            PropertyMock(return_value=self.org_payload))
+        page_patcher = patch("client.get_json_page",
+                             side_effect=self.pages.__getitem__)
+        org_patcher.start()
+        self.mock = page_patcher.start()
+        self.addCleanup(org_patcher.stop)
+        self.addCleanup(page_patcher.stop)
+
+    def test_iter_public_repos(self):
+        """
+        Test that names are yielded after the first round trip only.
+        """
+        names = GithubOrgClient("google").iter_public_repos()
+        self.assertEqual(next(names), self.expected_repos[0])
+        self.assertEqual(self.mock.call_count, 1)
+        self.assertEqual([self.expected_repos[0]] + list(names),
+                         self.expected_repos)
+        self.assertEqual(self.mock.call_count, len(self.pages))
+
+    def test_iter_public_repos_with_license(self):
+        """
+        Test license filtering while streaming pages.
+        """
+        client = GithubOrgClient("google")
+        self.assertEqual(list(client.iter_public_repos("apache-2.0")),
+                         self.apache2_repos)
+
+    def test_paginated_repos_payload(self):
+        """
+        Test that paginated mode collects every page once.
+        """
+        client = GithubOrgClient("google", paginate=True)
+        self.assertEqual(client.public_repos(), self.expected_repos)
+        self.assertEqual(list(client.iter_public_repos()),
+                         self.expected_repos)
+        self.assertEqual(self.mock.call_count, len(self.pages))
+
+
+class TestSharedCache(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the 'shared_cache' of GithubOrgClient.
+    """
+
+    def setUp(self):
+        """Install a shared cache and patch 'get_json'."""
+        GithubOrgClient.shared_cache = MemoryStore()
+        self.addCleanup(setattr, GithubOrgClient, "shared_cache", None)
+        self.mock = self.patch_get_json()
+
+    def test_instances_share_payloads(self):
+        """
+        Test that a second client for the same org does no request.
+        """
+        for _ in range(3):
+            self.assertEqual(GithubOrgClient("google").public_repos(),
+                             self.expected_repos)
+        self.assertEqual(self.mock.call_count, 2)
+        GithubOrgClient("abc").org
+        self.assertEqual(self.mock.call_count, 3)
+
+
+class TestLicenseIndex(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the license index of GithubOrgClient.
+    """
+
+    def setUp(self):
+        """Patch 'get_json' to serve fresh copies of the fixture."""
+        self.mock = self.patch_get_json()
+
+    def test_public_repos_by_license(self):
+        """
+        Test that indexed lookups match 'has_license' filtering.
+        """
+        client = GithubOrgClient("google")
+        for key in ("apache-2.0", "bsd-3-clause", "mit", "XLICENSE"):
+            expected = [repo["name"] for repo in self.repos_payload
+                        if GithubOrgClient.has_license(repo, key)]
+            self.assertEqual(client.public_repos(key), expected)
+        self.assertEqual(client.public_repos("apache-2.0"),
+                         self.apache2_repos)
+
+    def test_license_counts(self):
+        """
+        Test the per-license summary.
+        """
+        counts = GithubOrgClient("google").license_counts()
+        self.assertEqual(counts["apache-2.0"], len(self.apache2_repos))
+        self.assertEqual(sum(counts.values()), len([
+            repo for repo in self.repos_payload if repo.get("license")]))
+
+    def test_index_rebuilt_on_refresh(self):
+        """
+        Test that the index follows a refreshed payload.
+        """
+        client = GithubOrgClient("google")
+        client.public_repos("apache-2.0")
+        self.repos_payload = [repo for repo in self.repos_payload
+                              if repo["name"] == self.apache2_repos[-1]]
+        invalidate(client, "repos_payload")
+        self.assertEqual(client.public_repos("apache-2.0"),
+                         self.apache2_repos[-1:])
+
+
+class TestQuery(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the 'query' method of GithubOrgClient.
+    """
+
+    def setUp(self):
+        """Serve the first fixture as repos payload."""
+        patcher = patch("client.GithubOrgClient.repos_payload",
+                        PropertyMock(return_value=self.repos_payload))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = GithubOrgClient("google")
+
+    def test_filters(self):
+        """
+        Test equality filters and the star threshold together.
+        """
+        expected = [{"name": repo["name"]} for repo in self.repos_payload
+                    if GithubOrgClient.has_license(repo, "apache-2.0")
+                    and not repo["fork"] and repo["language"] == "JavaScript"
+                    and repo["stargazers_count"] >= 100]
+        self.assertTrue(expected)
+        self.assertEqual(self.client.query(
+            license="apache-2.0", fork=False, language="JavaScript",
+            min_stars=100), expected)
+
+    @parameterized.expand([
+        ("-stargazers_count", 3, True),
+        ("forks_count", 4, False),
+        ("-watchers", None, True),
+    ])
+    def test_order_by(self, order_by, limit, reverse):
+        """
+        Test top-k selection against a full sort.
+        """
+        field = order_by.lstrip("-")
+        ranked = sorted(self.repos_payload, key=lambda repo: repo[field],
+                        reverse=reverse)[:limit]
+        self.assertEqual(
+            self.client.query(fields=("name", field), order_by=order_by,
+                              limit=limit),
+            [{"name": repo["name"], field: repo[field]} for repo in ranked])
+
+    def test_nested_fields(self):
+        """
+        Test dotted field names in filters and projections.
+        """
+        result = self.client.query(fields=("name", "license.key"),
+                                   **{"owner.login": "google"}, limit=2)
+        self.assertEqual(result, [
+            {"name": repo["name"], "license.key": repo["license"]["key"]}
+            for repo in self.repos_payload[:2]])
+        self.assertEqual(self.client.query(language="Cobol"), [])
+
+    def test_unhashable_filters(self):
+        """
+        Test filters on dict and list values scan instead of indexing.
+        """
+        owner = self.repos_payload[0]["owner"]
+        self.assertEqual(self.client.query(owner=owner, limit=2),
+                         [{"name": repo["name"]}
+                          for repo in self.repos_payload[:2]])
+        self.assertEqual(self.client.query(topics=[]), [])
+        self.assertEqual(self.client.query(owner={}), [])
+
+
+@parameterized_class(
+    ("org_payload", "repos_payload", "expected_repos", "apache2_repos"),
+    TEST_PAYLOAD
+)
+class TestProjection(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for GithubOrgClient built with 'fields'.
+    """
+
+    fields = ("license.key", "fork", "stargazers_count")
+
+    def setUp(self):
+        """Patch 'get_json' to serve the fixture."""
+        self.patch_get_json()
+
+    def test_public_repos(self):
+        """
+        Test license filtering and queries over projected records.
+        """
+        client = GithubOrgClient("google", fields=self.fields)
+        self.assertEqual(client.public_repos(), self.expected_repos)
+        self.assertEqual(client.public_repos("apache-2.0"),
+                         self.apache2_repos)
+        full = GithubOrgClient("google")
+        query = {"fields": ("name", "stargazers_count"), "fork": False,
+                 "order_by": "-stargazers_count", "limit": 3}
+        self.assertEqual(client.query(**query), full.query(**query))
+
+    def test_records_are_slim(self):
+        """
+        Test that records only hold the requested fields.
+        """
+        repo = GithubOrgClient("google", fields=self.fields).repos_payload[0]
+        self.assertFalse(hasattr(repo, "__dict__"))
+        self.assertEqual(set(repo), {"name", "license", "fork",
+                                     "stargazers_count"})
+        self.assertEqual(dict(repo["license"]),
+                         {"key": self.repos_payload[0]["license"]["key"]})
+
+
+class TestBulkGithubOrgClient(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the BulkGithubOrgClient class.
+    """
+
+    def fake_get_json(self, url):
+        """Serve fixtures, failing for the 'broken' org."""
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.01)
+        with self.lock:
+            self.active -= 1
+        if url.endswith("/broken"):
+            raise ValueError("boom")
+        return self.serve(url)
+
+    def setUp(self):
+        """Patch 'client.get_json' with 'fake_get_json'."""
+        self.lock, self.active, self.peak = threading.Lock(), 0, 0
+        self.mock = self.patch_get_json(self.fake_get_json)
+
+    def test_public_repos(self):
+        """
+        Test that results and errors are reported per org.
+        """
+        bulk = BulkGithubOrgClient(["google", "broken", "abc", "google"])
+        results, errors = bulk.public_repos("apache-2.0")
+        self.assertEqual(results, {"google": self.apache2_repos,
+                                   "abc": self.apache2_repos})
+        self.assertEqual(list(errors), ["broken"])
+        self.assertIsInstance(errors["broken"], ValueError)
+        self.assertEqual(self.mock.call_count, 5)
+
+    def test_max_concurrency(self):
+        """
+        Test that no more than 'max_concurrency' orgs are in flight.
+        """
+        bulk = BulkGithubOrgClient("org{}".format(i) for i in range(20))
+        results, errors = bulk.public_repos(max_concurrency=4)
+        self.assertEqual(len(results), 20)
+        self.assertEqual(errors, {})
+        self.assertLessEqual(self.peak, 4)
+        self.assertGreater(self.peak, 1)
+
+
+class TestSnapshotStore(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the 'snapshot_store' of GithubOrgClient.
+    """
+
+    def setUp(self):
+        """Install a snapshot store in a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+        GithubOrgClient.snapshot_store = SnapshotStore(self.path)
+        self.addCleanup(setattr, GithubOrgClient, "snapshot_store", None)
+        self.fetched = threading.Event()
+
+        def fake_get_json(url):
+            if url == self.org_payload["repos_url"]:
+                self.fetched.set()
+            return self.serve(url)
+
+        self.mock = self.patch_get_json(fake_get_json)
+
+    def test_warm_start(self):
+        """
+        Test that a new process serves snapshots without requests.
+        """
+        GithubOrgClient("google").public_repos()
+        self.assertEqual(self.mock.call_count, 2)
+        GithubOrgClient.snapshot_store = SnapshotStore(self.path)
+        self.assertEqual(GithubOrgClient("google").public_repos(),
+                         self.expected_repos)
+        self.assertEqual(self.mock.call_count, 2)
+
+    def test_expired_snapshot_revalidates(self):
+        """
+        Test that an expired snapshot is served then refreshed.
+        """
+        store = GithubOrgClient.snapshot_store = SnapshotStore(self.path,
+                                                               ttl=0)
+        store.save("org:google", self.org_payload)
+        store.save("repos:" + self.org_payload["repos_url"],
+                   self.repos_payload[:1])
+        client = GithubOrgClient("google")
+        self.assertEqual(client.public_repos(), self.expected_repos[:1])
+        self.assertTrue(self.fetched.wait(5))
+        for _ in range(100):
+            if client.public_repos() == self.expected_repos:
+                break
+            time.sleep(0.01)
+        self.assertEqual(client.public_repos(), self.expected_repos)
+        self.assertEqual(
+            store.load("repos:" + self.org_payload["repos_url"]).value,
+            self.repos_payload)
+
+    def test_refresh_not_overwritten_by_stale(self):
+        """
+        Test that a refresh finishing before the lookup that served the
+        expired snapshot has memoized it still wins.
+        """
+        store = GithubOrgClient.snapshot_store = SnapshotStore(self.path,
+                                                               ttl=0)
+        store.save("org:google", self.org_payload)
+        store.save("repos:" + self.org_payload["repos_url"],
+                   self.repos_payload[:1])
+        threads = []
+
+        def run_first(fn, *args):
+            thread = threading.Thread(target=fn, args=args)
+            threads.append(thread)
+            thread.start()
+            thread.join(0.2)
+
+        with patch("client.run_in_background", side_effect=run_first):
+            client = GithubOrgClient("google")
+            client.repos_payload
+        for thread in threads:
+            thread.join()
+        self.assertEqual(client.public_repos(), self.expected_repos)
+
+    def test_failed_revalidation(self):
+        """
+        Test that revalidations run at background priority and that a
+        failed one is counted and retried on the next read.
+        """
+        store = GithubOrgClient.snapshot_store = SnapshotStore(self.path,
+                                                               ttl=0)
+        store.save("org:google", self.org_payload)
+        store.save("repos:" + self.org_payload["repos_url"],
+                   self.repos_payload[:1])
+        priorities, failures = [], [ConnectionError("down")]
+
+        def fake_get_json(url):
+            priorities.append(utils._priority.get())
+            if url == self.org_payload["repos_url"] and failures:
+                raise failures.pop()
+            return self.serve(url)
+
+        errors = GithubOrgClient.revalidation_errors
+        self.addCleanup(setattr, GithubOrgClient, "revalidation_errors",
+                        errors)
+        self.mock.side_effect = fake_get_json
+        threads = []
+
+        def run(fn, *args):
+            thread = threading.Thread(target=fn, args=args)
+            threads.append(thread)
+            thread.start()
+
+        with patch("client.run_in_background", side_effect=run):
+            client = GithubOrgClient("google")
+            for expected in (self.expected_repos[:1],
+                             self.expected_repos[:1], self.expected_repos):
+                while threads:
+                    threads.pop().join()
+                self.assertEqual(client.public_repos(), expected)
+        self.assertEqual(GithubOrgClient.revalidation_errors, errors + 1)
+        self.assertEqual(set(priorities), {utils.BACKGROUND})
+
+    def test_paginated_revalidation_refetches(self):
+        """
+        Test that revalidating a paginated client walks the listing
+        instead of re-reading the memoized snapshot.
+        """
+        store = GithubOrgClient.snapshot_store = SnapshotStore(self.path,
+                                                               ttl=0)
+        store.save("org:google", self.org_payload)
+        store.save("repos:" + self.org_payload["repos_url"],
+                   self.repos_payload)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        for _ in range(4):
+            utils.run_in_background(release.wait)
+        fresh = self.repos_payload[:2]
+        with patch("client.get_json_page", return_value=(fresh, None)):
+            client = GithubOrgClient("google", paginate=True)
+            self.assertEqual(client.public_repos(), self.expected_repos)
+            release.set()
+            deadline = time.monotonic() + 5
+            while GithubOrgClient._refreshing \
+                    and time.monotonic() < deadline:
+                time.sleep(0.01)
+        self.assertEqual(client.public_repos(),
+                         [repo["name"] for repo in fresh])
+        self.assertEqual(
+            store.load("repos:" + self.org_payload["repos_url"]).value,
+            fresh)
+
+
+class TestSync(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for the 'sync' method of GithubOrgClient.
+
+    The patched listing serves 'self.server' by descending 'updated_at'
+    in pages of two repos.
+    """
+
+    def listing(self, url):
+        """Serve one page of the sorted listing."""
+        page = int(url.rsplit("&page=", 1)[1]) if "&page=" in url else 0
+        repos = sorted(self.server, key=lambda repo: repo["updated_at"],
+                       reverse=True)
+        more = 2 * page + 2 < len(repos)
+        return (copy.deepcopy(repos[2 * page:2 * page + 2]),
+                "{}&page={}".format(url.split("&page=")[0], page + 1)
+                if more else None)
+
+    def setUp(self):
+        """Patch the org payload and the paginated listing."""
+        self.server = copy.deepcopy(self.repos_payload)
+        for patcher in (
+            patch("client.GithubOrgClient.org",
+                  PropertyMock(return_value=self.org_payload)),
+            patch("client.get_json_page", side_effect=self.listing),
+        ):
+            self.mock = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def expected(self, license):
+        """Names of the server repos under 'license'."""
+        return sorted(repo["name"] for repo in self.server
+                      if GithubOrgClient.has_license(repo, license))
+
+    def test_first_sync_is_full(self):
+        """
+        Test that the first sync loads every repo.
+        """
+        client = GithubOrgClient("google")
+        result = client.sync()
+        self.assertEqual(sorted(result.added), sorted(self.expected_repos))
+        self.assertEqual((result.changed, result.removed), ([], []))
+        self.assertEqual(sorted(client.public_repos()),
+                         sorted(self.expected_repos))
+        self.assertEqual(self.mock.call_count, 5)
+
+    def test_delta_sync(self):
+        """
+        Test that a delta sync stops at the watermark and patches indexes.
+        """
+        client = GithubOrgClient("google")
+        client.sync()
+        client.public_repos("apache-2.0")
+        self.mock.reset_mock()
+        self.server[0]["updated_at"] = "2030-01-01T00:00:00Z"
+        self.server[0]["license"] = {"key": "apache-2.0"}
+        self.server.append(dict(self.server[1], name="new-repo",
+                                updated_at="2030-01-02T00:00:00Z"))
+        result = client.sync()
+        self.assertEqual(result, (["new-repo"], [self.server[0]["name"]],
+                                  []))
+        self.assertEqual(self.mock.call_count, 2)
+        self.assertIs(client._indexes[0], client.repos_payload)
+        for license in ("apache-2.0", "bsl-1.0", "bsd-3-clause"):
+            self.assertEqual(sorted(client.public_repos(license)),
+                             self.expected(license))
+        self.assertEqual(client.sync(), ([], [], []))
+        self.assertIs(client._indexes[0], client.repos_payload)
+
+    def test_full_sync_detects_removals(self):
+        """
+        Test that a full sync reports and drops removed repos.
+        """
+        client = GithubOrgClient("google")
+        client.sync()
+        removed = self.server.pop(2)["name"]
+        self.assertEqual(client.sync(full=True), ([], [], [removed]))
+        self.assertNotIn(removed, client.public_repos())
+        self.assertEqual(sorted(client.public_repos("apache-2.0")),
+                         self.expected("apache-2.0"))
+
+
+class TestMockGithubServer(unittest.TestCase):
+    """
+    Integration test case class running 'GithubOrgClient' against a
+    local 'MockGithubServer' instead of patched requests.
+    """
+
+    def setUp(self):
+        """
+        Start a server with one org of 75 repos, 30 per page.
+        """
+        self.server = MockGithubServer(orgs={"google": 75}).start()
+        self.addCleanup(self.server.stop)
+
+        class Client(GithubOrgClient):
+            ORG_URL = self.server.org_url()
+
+        self.Client = Client
+        self.repos = self.server.repos["google"]
+
+    def expected(self, license=None):
+        """
+        Names of the served repos, optionally filtered by license.
+        """
+        return [repo["name"] for repo in self.repos
+                if license is None
+                or GithubOrgClient.has_license(repo, license)]
+
+    def test_paginated_public_repos(self):
+        """
+        Test that a paginated client follows Link headers to the end.
+        """
+        client = self.Client("google", paginate=True)
+        self.assertEqual(client.public_repos(), self.expected())
+        self.assertEqual(client.public_repos("apache-2.0"),
+                         self.expected("apache-2.0"))
+        self.assertEqual(self.server.requests, 4)
+
+    def test_iter_after_first_page(self):
+        """
+        Test that iterating a default client walks every page even once
+        the first page is memoized as repos_payload.
+        """
+        client = self.Client("google")
+        self.assertEqual(client.public_repos(), self.expected()[:30])
+        self.assertEqual(list(client.iter_public_repos()), self.expected())
+
+    def test_sync(self):
+        """
+        Test that a sync walks the updated-first listing.
+        """
+        result = self.Client("google").sync()
+        self.assertEqual(result.added, self.expected())
+
+    def test_sync_after_first_page(self):
+        """
+        Test that the first sync of a client that only loaded the first
+        page lists every repo instead of stopping at its dates.
+        """
+        client = self.Client("google")
+        self.assertEqual(client.public_repos(), self.expected()[:30])
+        result = client.sync()
+        self.assertEqual(result, (self.expected()[30:], [], []))
+        self.assertEqual(client.public_repos(), self.expected())
+
+    def test_conditional_requests(self):
+        """
+        Test that the HTTP cache turns repeat fetches into 304s.
+        """
+        utils.configure_http_cache(MemoryStore())
+        self.addCleanup(utils.configure_http_cache, None)
+        for _ in range(2):
+            self.assertEqual(self.Client("google").public_repos(),
+                             self.expected()[:30])
+        self.assertEqual(self.server.requests, 4)
+        self.assertEqual(self.server.not_modified, 2)
+
+    def test_metrics(self):
+        """
+        Test the client cache, HTTP cache and filter metrics.
+        """
+        registry = MetricsRegistry()
+        utils.add_metrics_sink(registry)
+        self.addCleanup(utils.remove_metrics_sink, registry)
+        utils.configure_http_cache(MemoryStore())
+        self.addCleanup(utils.configure_http_cache, None)
+        for _ in range(2):
+            self.Client("google").public_repos("apache-2.0")
+        self.assertEqual(registry.sample("http_requests_total",
+                                         status="200"), (2, 2.0))
+        self.assertEqual(registry.sample("http_requests_total",
+                                         status="304"), (2, 2.0))
+        self.assertEqual(registry.sample("http_cache_total",
+                                         result="hit"), (2, 2.0))
+        self.assertEqual(registry.sample("client_cache_total",
+                                         source="fetch")[0], 4)
+        self.assertEqual(registry.sample("public_repos_filter_seconds")[0],
+                         2)
+        self.assertIn("# TYPE http_ttfb_seconds histogram",
+                      registry.expose())
+
+    def test_rate_limited(self):
+        """
+        Test that the server answers 403 with Retry-After once the
+        quota is spent, and that the rate limiter waits for the reset
+        instead of running into it.
+        """
+        self.server.rate_limit, self.server.window = 1, 1
+        url = self.server.url + "/orgs/google"
+        for status in (200, 403):
+            response = requests.get(url)
+            self.assertEqual(response.status_code, status)
+        self.assertEqual(response.headers["X-RateLimit-Remaining"], "0")
+        self.assertEqual(response.headers["Retry-After"], "1")
+        time.sleep(1)
+
+        self.server.requests = 0
+        utils.configure_rate_limiter(RateLimiter(rate=100, burst=10))
+        self.addCleanup(utils.configure_rate_limiter, None)
+        self.assertEqual(utils.get_json(url)["public_repos"], 75)
+        start = time.monotonic()
+        self.assertEqual(utils.get_json(url)["public_repos"], 75)
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+        self.assertEqual(self.server.requests, 2)
+
+
+class TestGraphQLTransport(unittest.TestCase):
+    """
+    Integration test case class for 'GraphQLTransport' against the
+    GraphQL stand-in of 'MockGithubServer'.
+    """
+
+    def setUp(self):
+        """
+        Start a server with two orgs and point clients at it.
+        """
+        self.server = MockGithubServer(
+            orgs={"google": 75, "abc": 5}).start()
+        self.addCleanup(self.server.stop)
+        self.transport = GraphQLTransport(self.server.url + "/graphql",
+                                          page_size=30)
+        patcher = patch.object(GithubOrgClient, "graphql", self.transport)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expected(self, org, license=None):
+        """
+        Names of the served repos of `org`, optionally by license.
+        """
+        return [repo["name"] for repo in self.server.repos[org]
+                if license is None
+                or GithubOrgClient.has_license(repo, license)]
+
+    def test_query(self):
+        """
+        Test that each org gets its own alias and variables.
+        """
+        query = GraphQLTransport.query(2)
+        self.assertIn("$login1: String!, $after1: String", query)
+        self.assertIn("org1: organization(login: $login1)", query)
+        self.assertIn("repositories(first: $first, after: $after1", query)
+
+    def test_public_repos(self):
+        """
+        Test that a client reads REST-shaped payloads over GraphQL.
+        """
+        client = GithubOrgClient("google")
+        self.assertEqual(client.org["public_repos"], 75)
+        self.assertEqual(client.public_repos(), self.expected("google"))
+        self.assertEqual(client.public_repos("apache-2.0"),
+                         self.expected("google", "apache-2.0"))
+        self.assertEqual(list(client.iter_public_repos("bsl-1.0")),
+                         self.expected("google", "bsl-1.0"))
+        self.assertEqual(self.server.requests, 3)
+
+    def test_rest_clients_share_caches(self):
+        """
+        Test that GraphQL payloads cached or snapshotted do not stand in
+        for the REST ones, and that REST-only calls refuse clearly.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, store in (("shared_cache", MemoryStore()),
+                            ("snapshot_store",
+                             SnapshotStore(directory.name))):
+            patcher = patch.object(GithubOrgClient, name, store)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        graphql_client = GithubOrgClient("abc")
+        self.assertEqual(graphql_client.public_repos(), self.expected("abc"))
+        with self.assertRaisesRegex(RuntimeError, "over REST"):
+            graphql_client.sync()
+        with self.assertRaisesRegex(RuntimeError, "no REST repos URL"):
+            graphql_client._public_repos_url
+
+        class Client(GithubOrgClient):
+            ORG_URL = self.server.org_url()
+            graphql = None
+
+        self.assertEqual(Client("abc").public_repos(), self.expected("abc"))
+
+    def test_projection(self):
+        """
+        Test that projected clients keep the GraphQL license keys.
+        """
+        client = GithubOrgClient("abc", fields=("license.key",))
+        self.assertEqual(client.query(license="apache-2.0"),
+                         [{"name": name} for name in
+                          self.expected("abc", "apache-2.0")])
+
+    def test_bulk(self):
+        """
+        Test that a bulk client batches every org into shared queries
+        and reports unknown orgs.
+        """
+        bulk = BulkGithubOrgClient(["google", "abc", "missing"])
+        results, errors = bulk.public_repos("apache-2.0")
+        self.assertEqual(results, {
+            org: self.expected(org, "apache-2.0") for org in ("google", "abc")
+        })
+        self.assertEqual(list(errors), ["missing"])
+        self.assertIsInstance(errors["missing"], GraphQLError)
+        self.assertEqual(self.server.requests, 3)
+        bulk.public_repos()
+        self.assertEqual(self.server.requests, 4)
+
+    def test_bulk_failed_batches(self):
+        """
+        Test that a failed request or a data-less answer becomes the
+        error of every org of its batch.
+        """
+        self.transport.batch_size = 1
+        post_json = client.post_json
+
+        def failing(url, payload, headers=None):
+            login = payload["variables"]["login0"]
+            if login == "abc":
+                raise requests.ConnectionError("reset")
+            if login == "other":
+                return {"data": None,
+                        "errors": [{"message": "Something went wrong"}]}
+            return post_json(url, payload, headers)
+
+        with patch("client.post_json", side_effect=failing):
+            results, errors = BulkGithubOrgClient(
+                ["google", "abc", "other"]).public_repos()
+        self.assertEqual(results, {"google": self.expected("google")})
+        self.assertIsInstance(errors["abc"], requests.ConnectionError)
+        self.assertIsInstance(errors["other"], GraphQLError)
+        self.assertEqual(str(errors["other"]), "Something went wrong")
+
+    def test_batch_size(self):
+        """
+        Test that orgs beyond 'batch_size' go to later queries.
+        """
+        self.transport.batch_size = 1
+        payloads, errors = self.transport.fetch_many(["abc", "google"])
+        self.assertEqual(errors, {})
+        self.assertEqual([repo["name"] for repo in payloads["google"][1]],
+                         self.expected("google"))
+        self.assertEqual(self.server.requests, 4)
+
+    def test_unknown_org(self):
+        """
+        Test that 'fetch' raises the endpoint's error message.
+        """
+        with self.assertRaisesRegex(GraphQLError, "login of 'nope'"):
+            self.transport.fetch("nope")
+
+
+@unittest.skipUnless(client.numpy, "numpy is not installed")
+class TestRepoColumns(FixtureMixin, unittest.TestCase):
+    """
+    Unit tests for 'RepoColumns' and columnar GithubOrgClient.
+    """
+
+    def setUp(self):
+        """Serve the first fixture as repos payload."""
+        patcher = patch("client.GithubOrgClient.repos_payload",
+                        PropertyMock(return_value=self.repos_payload))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = GithubOrgClient("google", columnar=True)
+
+    @parameterized.expand([
+        (None,), ("apache-2.0",), ("bsl-1.0",), ("bsd-3-clause",),
+        ("unknown",),
+    ])
+    def test_public_repos(self, license):
+        """
+        Test that license masks select what the index selects.
+        """
+        self.assertEqual(self.client.public_repos(license),
+                         GithubOrgClient("google").public_repos(license))
+
+    def test_license_counts(self):
+        """
+        Test that 'bincount' counts match the index counts.
+        """
+        self.assertEqual(self.client.license_counts(),
+                         GithubOrgClient("google").license_counts())
+
+    def test_filters(self):
+        """
+        Test star thresholds and flags against 'query'.
+        """
+        columns = self.client.columns
+        self.assertIs(self.client.columns, columns)
+        expected = [row["name"] for row in self.client.query(
+            license="apache-2.0", fork=False, min_stars=100)]
+        self.assertTrue(expected)
+        self.assertEqual(columns.public_repos(
+            "apache-2.0", fork=False, min_stars=100), expected)
+        self.assertEqual(columns.license_counts(min_stars=100), {
+            key: len(self.client.query(license=key, min_stars=100))
+            for key in columns.licenses[1:]
+            if self.client.query(license=key, min_stars=100)})
+
+    def test_projected_records(self):
+        """
+        Test columns built from slim records missing some fields.
+        """
+        project = client.compile_projection(("name", "license.key"))
+        columns = RepoColumns([project(repo)
+                               for repo in self.repos_payload])
+        self.assertEqual(len(columns), len(self.repos_payload))
+        self.assertEqual(columns.public_repos("apache-2.0"),
+                         self.client.public_repos("apache-2.0"))
+        self.assertEqual(int(columns.stars.sum()), 0)
+
+    def test_requires_numpy(self):
+        """
+        Test that the columnar option fails early without numpy.
+        """
+        with patch("client.numpy", None):
+            with self.assertRaises(ImportError):
+                GithubOrgClient("google", columnar=True)
+            with self.assertRaises(ImportError):
+                RepoColumns(self.repos_payload)
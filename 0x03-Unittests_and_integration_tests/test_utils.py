@@ -23,13 +23,68 @@ Test Classes:
    - Tests the retrieval of JSON from different URLs.
 
 3. 'TestMemoize': Test case class for 'memoize' decorator.
-   - Tests the memoization of a method within a class.
+   - Tests the memoization of a method within a class, expiry, size
+   bound, invalidation, statistics, single-flight computation and
+   stale-while-revalidate refreshes.
+
+4. 'TestSession': Test case class for the shared pooled session.
+   - Tests connection reuse and per-host pool sizes.
+
+5. 'TestGetJsonAsync': Test case class for 'get_json_async'.
+   - Tests the executor fallback and the asyncio session path.
+
+6. 'TestHttpCache': Test case class for conditional requests.
+   - Tests the LRU and directory stores and 304 handling in 'get_json'.
+
+7. 'TestAsyncMemoize': Test case class for 'async_memoize' decorator.
+   - Tests that concurrent awaits share one computation.
+
+8. 'TestCompilePath': Test case class for 'compile_path' accessors.
+   - Tests parity with 'access_nested_map', defaults, wildcards and
+   batch evaluation.
+
+9. 'TestCompileProjection': Test case class for 'compile_projection'.
+   - Tests field selection, nested and missing fields and storage.
+
+10. 'TestIterJsonItems': Test case class for streaming JSON arrays.
+   - Tests incremental decoding across chunk boundaries and projection.
+
+11. 'TestRateLimiter': Test case class for the request scheduler.
+   - Tests token pacing, header feedback, priorities and retries.
+
+12. 'TestSnapshotStore': Test case class for persistent snapshots.
+   - Tests round trips, TTL metadata, versioned keys and corruption.
+
+13. 'TestCoalescing': Test case class for request coalescing.
+   - Tests that concurrent threads and tasks share one request.
+
+14. 'TestJsonDecoder': Test case class for the JSON decoder registry.
+   - Tests backend selection, byte decoding and the fallback.
+
+15. 'TestMetrics': Test case class for the metrics hooks.
+   - Tests the registry, Prometheus exposition, request and memoize
+   metrics and that nothing is emitted without a sink.
 """
 
+import asyncio
+import datetime
+import email.utils
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
 import unittest
-from utils import access_nested_map, get_json, memoize
+from fixtures import TEST_PAYLOAD
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import utils
+from utils import (
+    access_nested_map, async_memoize, compile_path, compile_projection,
+    get_json, get_json_async, get_json_page, iter_json_items, memoize,
+)
 from parameterized import parameterized
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, PropertyMock, patch
 
 
 class TestAccessNestedMap(unittest.TestCase):
@@ -135,6 +190,20 @@ class TestGetJson(unittest.TestCase):
             self.assertEqual(response, test_payload)
             mock_response.json.assert_called_once()
 
+    def test_get_json_page(self):
+        """
+        Test that 'get_json_page' returns the page and its next URL.
+        """
+        mock_response = Mock(links={"next": {"url": "http://a.io/?p=2"}})
+        mock_response.json.return_value = [1, 2]
+        with patch("requests.get", return_value=mock_response):
+            self.assertEqual(get_json_page("http://a.io/"),
+                             ([1, 2], "http://a.io/?p=2"))
+        mock_response.links = {}
+        with patch("requests.get", return_value=mock_response):
+            self.assertEqual(get_json_page("http://a.io/?p=2"),
+                             ([1, 2], None))
+
 
 class TestMemoize(unittest.TestCase):
     """
@@ -175,3 +244,938 @@ class TestMemoize(unittest.TestCase):
             spec.a_property
             spec.a_property
             mocked.asset_called_once()
+
+    @staticmethod
+    def make_class(**options):
+        """Build a class counting calls of its memoized property."""
+
+        class TestClass:
+            calls = 0
+            priorities = []
+
+            @memoize(**options)
+            def a_property(self):
+                TestClass.calls += 1
+                TestClass.priorities.append(utils._priority.get())
+                return TestClass.calls
+
+        return TestClass
+
+    def test_memoize_ttl(self):
+        """
+        Test that a value older than 'ttl' is recomputed.
+        """
+        TestClass = self.make_class(ttl=10)
+        spec = TestClass()
+        with patch("utils.time.monotonic", side_effect=[0, 5, 10, 12]):
+            self.assertEqual(spec.a_property, 1)
+            self.assertEqual(spec.a_property, 1)
+            self.assertEqual(spec.a_property, 2)
+
+    def test_memoize_maxsize(self):
+        """
+        Test that the least recently used instance loses its value.
+        """
+        TestClass = self.make_class(maxsize=2)
+        first, second, third = TestClass(), TestClass(), TestClass()
+        first.a_property, second.a_property
+        first.a_property
+        third.a_property
+        self.assertTrue(hasattr(first, "_a_property"))
+        self.assertFalse(hasattr(second, "_a_property"))
+        self.assertEqual(TestClass.a_property.cache_info()["size"], 2)
+
+    def test_unbounded_untracked(self):
+        """
+        Test that without 'maxsize' owners are not tracked, and that
+        concurrent hits are all counted.
+        """
+        TestClass = self.make_class()
+        specs = [TestClass() for _ in range(4)]
+
+        def read():
+            for spec in specs * 500:
+                spec.a_property
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = TestClass.a_property.cache_info()
+        self.assertEqual(info["hits"] + info["misses"], 4 * 4 * 500)
+        self.assertIsNone(info["size"])
+        self.assertFalse(TestClass.a_property._owners)
+
+    def test_invalidate(self):
+        """
+        Test explicit invalidation and hit/miss statistics.
+        """
+        TestClass = self.make_class()
+        spec = TestClass()
+        self.assertEqual(spec.a_property, 1)
+        self.assertEqual(spec.a_property, 1)
+        utils.invalidate(spec, "a_property")
+        self.assertEqual(spec.a_property, 2)
+        info = TestClass.a_property.cache_info()
+        self.assertEqual((info["hits"], info["misses"]), (1, 2))
+
+    def test_stale_while_revalidate(self):
+        """
+        Test that a soft-expired value is served while refreshed.
+        """
+        TestClass = self.make_class(soft_ttl=10, ttl=100)
+        spec, now = TestClass(), [0]
+        with patch("utils.time.monotonic", side_effect=lambda: now[0]):
+            self.assertEqual(spec.a_property, 1)
+            now[0] = 10
+            self.assertEqual(spec.a_property, 1)
+            for _ in range(500):
+                if TestClass.a_property.cache_info()["refreshes"]:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(spec.a_property, 2)
+            self.assertEqual(TestClass.calls, 2)
+            now[0] = 200
+            self.assertEqual(spec.a_property, 3)
+        info = TestClass.a_property.cache_info()
+        self.assertEqual((info["refreshes"], info["misses"]), (1, 2))
+        self.assertEqual(TestClass.priorities, [
+            utils.INTERACTIVE, utils.BACKGROUND, utils.INTERACTIVE])
+
+    def test_single_flight(self):
+        """
+        Test that concurrent readers share one computation.
+        """
+        started, release = threading.Event(), threading.Event()
+
+        class TestClass:
+            calls = 0
+
+            @memoize(single_flight=True)
+            def a_property(self):
+                TestClass.calls += 1
+                started.set()
+                release.wait(5)
+                return 42
+
+        spec, results = TestClass(), []
+        threads = [threading.Thread(
+            target=lambda: results.append(spec.a_property))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((TestClass.calls, results), (1, [42] * 8))
+
+    def test_single_flight_exception(self):
+        """
+        Test that a failed computation is retried on next access.
+        """
+
+        class TestClass:
+            calls = 0
+
+            @memoize(single_flight=True)
+            def a_property(self):
+                TestClass.calls += 1
+                if TestClass.calls == 1:
+                    raise ValueError("boom")
+                return 42
+
+        spec = TestClass()
+        with self.assertRaises(ValueError):
+            spec.a_property
+        self.assertEqual(spec.a_property, 42)
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler answering every GET with a small JSON body."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        """Serve the request path back as JSON."""
+        body = json.dumps({"path": self.path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Silence request logging."""
+
+
+class _LocalServerTestCase(unittest.TestCase):
+    """
+    Base class serving '_JSONHandler' on a local server at 'cls.url'.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a local HTTP server in a background thread."""
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+        cls.url = "http://127.0.0.1:{}".format(cls.server.server_port)
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local HTTP server."""
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestSession(_LocalServerTestCase):
+    """
+    Test case class for 'configure_session' and 'pool_stats'.
+
+    A local keep-alive HTTP server is used so that connection reuse is
+    observed on real sockets rather than on mocks.
+    """
+
+    def tearDown(self):
+        """Go back to bare 'requests.get' after each test."""
+        utils.close_session()
+
+    def test_connections_are_reused(self):
+        """
+        Test that sequential 'get_json' calls share one connection.
+        """
+        utils.configure_session()
+        for i in range(5):
+            self.assertEqual(get_json("{}/{}".format(self.url, i)),
+                             {"path": "/{}".format(i)})
+        self.assertEqual(utils.pool_stats(), {
+            "requests": 5, "connections": 1, "hits": 4, "misses": 1,
+        })
+
+    def test_host_pool_sizes(self):
+        """
+        Test that per-host pool sizes are mounted on their prefix.
+        """
+        session = utils.configure_session(
+            pool_maxsize=4, host_pool_sizes={self.url: 32})
+        self.assertEqual(session.get_adapter(self.url)._pool_maxsize, 32)
+        self.assertEqual(
+            session.get_adapter("https://example.com")._pool_maxsize, 4)
+
+    def test_without_session(self):
+        """
+        Test that 'get_json' falls back to 'requests.get'.
+        """
+        self.assertEqual(utils.pool_stats()["requests"], 0)
+        mock_response = Mock()
+        mock_response.json.return_value = {"payload": True}
+        with patch("requests.get", return_value=mock_response) as mocked:
+            self.assertEqual(get_json(self.url), {"payload": True})
+            mocked.assert_called_once_with(self.url)
+
+
+class TestGetJsonAsync(unittest.IsolatedAsyncioTestCase):
+    """
+    Test case class for the 'get_json_async' coroutine.
+    """
+
+    async def test_executor_fallback(self):
+        """
+        Test that without a session 'get_json' runs in an executor.
+        """
+        with patch("utils.get_json", return_value={"a": 1}) as mocked:
+            self.assertEqual(await get_json_async("http://x"), {"a": 1})
+            mocked.assert_called_once_with("http://x")
+
+    async def test_session(self):
+        """
+        Test that an asyncio session is used when given.
+        """
+        response = MagicMock()
+        response.json = AsyncMock(return_value={"b": 2})
+        session = MagicMock()
+        session.get.return_value.__aenter__.return_value = response
+        self.assertEqual(await get_json_async("http://y", session),
+                         {"b": 2})
+        session.get.assert_called_once_with("http://y")
+
+    @staticmethod
+    def session(*responses):
+        """Mock asyncio session answering with 'responses' in turn."""
+        contexts = []
+        for status, headers, body in responses:
+            response = MagicMock(status=status, headers=headers, links={})
+            response.read = AsyncMock(return_value=body)
+            context = MagicMock()
+            context.__aenter__.return_value = response
+            contexts.append(context)
+        session = MagicMock()
+        session.get.side_effect = contexts
+        return session
+
+    async def test_session_shares_layers(self):
+        """
+        Test the HTTP cache, decoder, retries and metrics of a session.
+        """
+        utils.configure_http_cache(utils.MemoryStore())
+        self.addCleanup(utils.configure_http_cache, None)
+        utils.configure_json_decoder("json")
+        self.addCleanup(utils.configure_json_decoder, None)
+        utils.configure_rate_limiter(utils.RateLimiter())
+        self.addCleanup(utils.configure_rate_limiter, None)
+        registry = utils.MetricsRegistry()
+        utils.add_metrics_sink(registry)
+        self.addCleanup(utils.remove_metrics_sink, registry)
+        session = self.session((429, {"Retry-After": "0"}, b""),
+                               (200, {"ETag": '"v1"'}, b'{"b": 2}'),
+                               (304, {}, b""))
+        for _ in range(2):
+            self.assertEqual(await get_json_async("http://y", session),
+                             {"b": 2})
+        self.assertEqual(session.get.call_count, 3)
+        session.get.assert_called_with("http://y",
+                                       headers={"If-None-Match": '"v1"'})
+        self.assertEqual(registry.sample("http_requests_total",
+                                         status="429"), (1, 1.0))
+        self.assertEqual(registry.sample("http_cache_total",
+                                         result="hit"), (1, 1.0))
+        self.assertEqual(registry.sample("http_response_bytes"), (1, 8.0))
+        self.assertEqual(registry.sample("json_decode_seconds")[0], 1)
+
+
+class TestHttpCache(unittest.TestCase):
+    """
+    Test case class for 'configure_http_cache' and its stores.
+    """
+
+    def tearDown(self):
+        """Disable the HTTP cache after each test."""
+        utils.configure_http_cache(None)
+
+    def test_memory_store_lru(self):
+        """
+        Test that the least recently used entry is evicted first.
+        """
+        store = utils.MemoryStore(maxsize=2)
+        store.set("a", 1)
+        store.set("b", 2)
+        store.get("a")
+        store.set("c", 3)
+        self.assertEqual((store.get("a"), store.get("b"), store.get("c")),
+                         (1, None, 3))
+
+    def test_memory_store_byte_budget(self):
+        """
+        Test that old entries are evicted to stay within 'max_bytes'.
+        """
+        store = utils.MemoryStore(max_bytes=20)
+        store.set("a", "x" * 8)
+        store.set("b", "y" * 8)
+        self.assertEqual(store.nbytes, 20)
+        store.set("c", "z" * 8)
+        self.assertEqual((store.get("a"), len(store), store.nbytes),
+                         (None, 2, 20))
+
+    def test_directory_store_byte_budget(self):
+        """
+        Test that the least recently written files are removed first.
+        """
+        with tempfile.TemporaryDirectory() as path:
+            store = utils.DirectoryStore(path, max_bytes=25)
+            store.set("a", "x" * 8)
+            os.utime(store._file("a"), (0, 0))
+            store.set("b", "y" * 8)
+            store.set("c", "z" * 8)
+            self.assertIsNone(store.get("a"))
+            self.assertEqual(store.get("c"), "z" * 8)
+
+    def test_directory_store(self):
+        """
+        Test that entries survive a new store on the same directory.
+        """
+        with tempfile.TemporaryDirectory() as path:
+            utils.DirectoryStore(path).set("http://a.io", {"x": [1]})
+            store = utils.DirectoryStore(path)
+            self.assertEqual(store.get("http://a.io"), {"x": [1]})
+            store.delete("http://a.io")
+            self.assertIsNone(store.get("http://a.io"))
+
+    @parameterized.expand([
+        ({"ETag": '"abc"'}, {"If-None-Match": '"abc"'}),
+        ({"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+         {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+    ])
+    def test_not_modified(self, validators, conditional_headers):
+        """
+        Test that a 304 answer is served from the stored payload.
+        """
+        utils.configure_http_cache(utils.MemoryStore())
+        fresh = Mock(status_code=200, headers=validators, links={})
+        fresh.json.return_value = {"payload": True}
+        not_modified = Mock(status_code=304, headers={}, links={})
+        with patch("requests.get",
+                   side_effect=[fresh, not_modified]) as mocked:
+            self.assertEqual(get_json("http://a.io"), {"payload": True})
+            self.assertEqual(get_json("http://a.io"), {"payload": True})
+        mocked.assert_called_with("http://a.io",
+                                  headers=conditional_headers)
+        not_modified.json.assert_not_called()
+
+
+class TestAsyncMemoize(unittest.IsolatedAsyncioTestCase):
+    """
+    Test case class for the 'async_memoize' decorator.
+    """
+
+    async def test_async_memoize(self):
+        """
+        Test that concurrent awaits run the coroutine once.
+        """
+
+        class TestClass:
+            calls = 0
+
+            @async_memoize
+            async def a_method(self):
+                TestClass.calls += 1
+                await asyncio.sleep(0.01)
+                return 42
+
+        spec = TestClass()
+        results = await asyncio.gather(*(spec.a_method() for _ in range(8)))
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(await spec.a_method(), 42)
+        self.assertEqual(TestClass.calls, 1)
+
+    async def test_async_memoize_exception(self):
+        """
+        Test that a failed coroutine is retried on next call.
+        """
+
+        class TestClass:
+            calls = 0
+
+            @async_memoize
+            async def a_method(self):
+                TestClass.calls += 1
+                if TestClass.calls == 1:
+                    raise ValueError("boom")
+                return 42
+
+        spec = TestClass()
+        with self.assertRaises(ValueError):
+            await spec.a_method()
+        self.assertEqual(await spec.a_method(), 42)
+
+
+class TestCompilePath(unittest.TestCase):
+    """
+    Test case class for the 'compile_path' function.
+    """
+
+    @parameterized.expand([
+        ({"a": 1}, ("a",), 1),
+        ({"a": {"b": 2}}, ("a",), {"b": 2}),
+        ({"a": {"b": 2}}, ("a", "b"), 2),
+        ({"a": {"b": {"c": 3}}}, ("a", "b", "c"), 3),
+    ])
+    def test_compile_path(self, nested_map, path, expected_output):
+        """
+        Test that compiled accessors match 'access_nested_map'.
+        """
+        self.assertEqual(compile_path(path)(nested_map), expected_output)
+        self.assertEqual(access_nested_map(nested_map, path),
+                         expected_output)
+
+    @parameterized.expand([
+        ({}, ("a",), "a"),
+        ({"a": 1}, ("a", "b"), "b"),
+        ({"a": None}, ("a", "b"), "b"),
+        ({"a": {"b": "c"}}, ("a", "b", "c"), "c"),
+    ])
+    def test_compile_path_missing(self, nested_map, path, missing_key):
+        """
+        Test that missing paths raise 'KeyError' or return the default.
+        """
+        with self.assertRaises(KeyError) as error:
+            compile_path(path)(nested_map)
+        self.assertEqual(error.exception.args, (missing_key,))
+        self.assertEqual(compile_path(path, default=0)(nested_map), 0)
+
+    def test_wildcard(self):
+        """
+        Test that '*' expands over mapping values and list items.
+        """
+        owners = {"owner": {"a": {"login": "x"}, "b": {"login": "y"},
+                            "c": {}}}
+        self.assertEqual(compile_path(("owner", "*", "login"))(owners),
+                         ["x", "y"])
+        topics = {"topics": [{"name": "go"}, {"name": "ml"}]}
+        self.assertEqual(compile_path(("topics", "*", "name"))(topics),
+                         ["go", "ml"])
+
+    def test_many(self):
+        """
+        Test batch evaluation over a list of maps.
+        """
+        maps = [{"license": {"key": "mit"}}, {"license": None}, {}]
+        self.assertEqual(
+            compile_path(("license", "key"), default=None).many(maps),
+            ["mit", None, None])
+
+
+class TestCompileProjection(unittest.TestCase):
+    """
+    Test case class for the 'compile_projection' function.
+    """
+
+    repo = {"name": "x", "fork": False, "owner": {"login": "g", "id": 1},
+            "license": None, "size": 10}
+
+    def test_projection(self):
+        """
+        Test that only the requested fields are kept.
+        """
+        record = compile_projection(("name", "owner.login"))(self.repo)
+        self.assertEqual(record, {"name": "x", "owner": {"login": "g"}})
+        self.assertEqual(access_nested_map(record, ("owner", "login")), "g")
+        with self.assertRaises(KeyError):
+            record["size"]
+
+    def test_missing_and_non_mapping_fields(self):
+        """
+        Test that missing fields are absent and non-mappings kept as is.
+        """
+        record = compile_projection(("license.key", "topics"))(self.repo)
+        self.assertEqual(dict(record), {"license": None})
+        self.assertEqual(len(record), 1)
+
+    def test_storage(self):
+        """
+        Test that records pickle and fit in JSON stores.
+        """
+        record = compile_projection(("name", "owner.id"))(self.repo)
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+        store = utils.MemoryStore(max_bytes=1024)
+        store.set("k", [record])
+        self.assertEqual(store.nbytes,
+                         len('[{"name":"x","owner":{"id":1}}]'))
+
+
+class TestIterJsonItems(unittest.TestCase):
+    """
+    Test case class for 'iter_json_items' and 'get_json(stream=True)'.
+    """
+
+    repos = TEST_PAYLOAD[0][1] + [12.5, -3e-07, "x\u00e9", None, [1, [2]]]
+
+    def stream(self, size):
+        """Mock a streamed response of 'repos' in 'size'-byte chunks."""
+        body = json.dumps(self.repos, ensure_ascii=False).encode()
+        self.consumed = 0
+
+        def iter_content(chunk_size):
+            for i in range(0, len(body), size):
+                self.consumed = i + size
+                yield body[i:i + size]
+
+        response = Mock()
+        response.iter_content.side_effect = iter_content
+        return patch("requests.get", return_value=response)
+
+    @parameterized.expand([(5,), (7,), (4096,), (1 << 20,)])
+    def test_iter_json_items(self, size):
+        """
+        Test that items decode identically whatever the chunking.
+        """
+        with self.stream(size) as mocked:
+            self.assertEqual(list(get_json("http://a.io", stream=True)),
+                             self.repos)
+        mocked.assert_called_once_with("http://a.io", stream=True)
+        mocked.return_value.close.assert_called_once()
+
+    def test_first_item_before_body_end(self):
+        """
+        Test that the first item is yielded before the body is read.
+        """
+        with self.stream(512):
+            items = iter_json_items("http://a.io")
+            self.assertEqual(next(items), self.repos[0])
+            self.assertLess(self.consumed, len(json.dumps(self.repos)) / 2)
+
+    def test_first_item_before_body_end_with_metrics(self):
+        """
+        Test that a metrics sink neither reads the streamed body ahead
+        nor misses its size.
+        """
+        registry = utils.MetricsRegistry()
+        utils.add_metrics_sink(registry)
+        self.addCleanup(utils.remove_metrics_sink, registry)
+        body = json.dumps(self.repos, ensure_ascii=False).encode()
+        with self.stream(512) as mocked:
+            response = mocked.return_value
+            response.status_code = 200
+            response.elapsed = datetime.timedelta(0)
+            type(response).content = PropertyMock(
+                side_effect=AssertionError)
+            items = iter_json_items("http://a.io")
+            self.assertEqual(next(items), self.repos[0])
+            self.assertLess(self.consumed, len(body) / 2)
+            self.assertEqual(registry.sample("http_response_bytes"),
+                             (0, 0.0))
+            self.assertEqual(list(items), self.repos[1:])
+        self.assertEqual(registry.sample("http_response_bytes"),
+                         (1, float(len(body))))
+        self.assertEqual(registry.sample("http_transfer_seconds")[0], 1)
+
+    def test_projection(self):
+        """
+        Test on-the-fly projection of streamed items.
+        """
+        with self.stream(100):
+            items = iter_json_items("http://a.io", fields=("name",))
+            self.assertEqual(next(items), {"name": self.repos[0]["name"]})
+
+    @parameterized.expand([(b"{}",), (b"[1, 2",), (b"[1 2]",)])
+    def test_invalid(self, body):
+        """
+        Test that non-array or truncated bodies raise 'ValueError'.
+        """
+        response = Mock()
+        response.iter_content.return_value = [body]
+        with patch("requests.get", return_value=response):
+            with self.assertRaises(ValueError):
+                list(iter_json_items("http://a.io"))
+
+
+class TestRateLimiter(unittest.TestCase):
+    """
+    Test case class for 'RateLimiter' and 'configure_rate_limiter'.
+
+    The monotonic clock is patched so waits are computed, not slept.
+    """
+
+    def setUp(self):
+        """Freeze the monotonic clock at 0."""
+        self.now = 0.0
+        patcher = patch("utils.time.monotonic", side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        """Disable pacing after each test."""
+        utils.configure_rate_limiter(None)
+
+    def test_token_bucket(self):
+        """
+        Test that a burst is served then requests are paced at 'rate'.
+        """
+        limiter = utils.RateLimiter(rate=2, burst=2)
+        waits = [limiter._take(utils.INTERACTIVE) for _ in range(3)]
+        self.assertEqual(waits, [0, 0, 0.5])
+        self.now = 0.5
+        self.assertEqual(limiter._take(utils.INTERACTIVE), 0)
+
+    def test_update_from_headers(self):
+        """
+        Test that remaining quota retunes the rate and Retry-After blocks.
+        """
+        limiter = utils.RateLimiter(rate=100, burst=10)
+        limiter.update({"X-RateLimit-Remaining": "30",
+                        "X-RateLimit-Reset": str(time.time() + 60)})
+        self.assertAlmostEqual(limiter.rate, 0.5, places=2)
+        limiter.update({"Retry-After": "7"})
+        self.assertEqual(limiter._take(utils.INTERACTIVE), 7)
+        limiter.update({"X-RateLimit-Remaining": "0",
+                        "X-RateLimit-Reset": str(time.time() + 60)})
+        self.assertGreater(limiter._take(utils.INTERACTIVE), 59)
+
+    def test_retry_after_http_date(self):
+        """
+        Test that Retry-After also accepts an HTTP date or garbage.
+        """
+        limiter = utils.RateLimiter(rate=100, burst=10)
+        limiter.update({"Retry-After": "soon"})
+        self.assertEqual(limiter._take(utils.INTERACTIVE), 0)
+        when = datetime.datetime.now(datetime.timezone.utc) \
+            + datetime.timedelta(seconds=30)
+        limiter.update({"Retry-After": email.utils.format_datetime(
+            when, usegmt=True)})
+        self.assertAlmostEqual(limiter._take(utils.INTERACTIVE), 30,
+                               delta=2)
+
+    def test_background_yields_to_interactive(self):
+        """
+        Test that background callers wait while interactive ones do.
+        """
+        limiter = utils.RateLimiter(rate=1, burst=5)
+        limiter._interactive_waiting = 1
+        self.assertGreater(limiter._take(utils.BACKGROUND), 0)
+        self.assertEqual(limiter._take(utils.INTERACTIVE), 0)
+        limiter._interactive_waiting = 0
+        with utils.request_priority(utils.BACKGROUND):
+            limiter.acquire()
+        self.assertEqual(limiter.tokens, 3)
+
+    def test_get_json_retries_after_limit(self):
+        """
+        Test that a rate-limited answer is retried after Retry-After.
+        """
+        limiter = utils.configure_rate_limiter(utils.RateLimiter())
+        limited = Mock(status_code=429, headers={"Retry-After": "0"})
+        fine = Mock(status_code=200, headers={})
+        fine.json.return_value = {"payload": True}
+        with patch("requests.get", side_effect=[limited, fine]) as mocked:
+            self.assertEqual(get_json("http://a.io"), {"payload": True})
+        self.assertEqual(mocked.call_count, 2)
+        self.assertEqual(limiter.tokens, limiter.burst - 2)
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """
+    Test case class for 'SnapshotStore'.
+    """
+
+    def setUp(self):
+        """Use a temporary directory per test."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = directory.name
+
+    def test_round_trip(self):
+        """
+        Test that a payload reloads from a new store with its metadata.
+        """
+        utils.SnapshotStore(self.path, ttl=60).save("k", TEST_PAYLOAD[0][1])
+        snapshot = utils.SnapshotStore(self.path).load("k")
+        self.assertEqual(snapshot.value, TEST_PAYLOAD[0][1])
+        self.assertEqual(snapshot.ttl, 60)
+        self.assertFalse(snapshot.expired)
+        self.assertEqual(
+            utils.SnapshotStore(self.path, ttl=0).load("k").ttl, 60)
+
+    def test_expired(self):
+        """
+        Test that a snapshot past its TTL is flagged as expired.
+        """
+        utils.SnapshotStore(self.path, ttl=0).save("k", [1])
+        self.assertTrue(utils.SnapshotStore(self.path).load("k").expired)
+
+    def test_versions_and_corruption(self):
+        """
+        Test that other versions and damaged files are misses.
+        """
+        store = utils.SnapshotStore(self.path, version=1)
+        store.save("k", {"a": 1})
+        self.assertIsNone(utils.SnapshotStore(self.path, version=2).load("k"))
+        with open(store._file("k"), "r+b") as file:
+            file.truncate(30)
+        self.assertIsNone(store.load("k"))
+        self.assertIsNone(store.load("missing"))
+
+
+class TestCoalescing(unittest.IsolatedAsyncioTestCase):
+    """
+    Test case class for 'configure_coalescing' and 'coalesce_stats'.
+    """
+
+    def setUp(self):
+        """Enable coalescing and remember the counters."""
+        utils.configure_coalescing(True)
+        self.addCleanup(utils.configure_coalescing, False)
+        self.before = utils.coalesce_stats()
+
+    def delta(self):
+        """Counters gained since 'setUp'."""
+        return {key: value - self.before[key]
+                for key, value in utils.coalesce_stats().items()}
+
+    def test_threads_share_one_request(self):
+        """
+        Test that concurrent threads get the result of one request.
+        """
+        release, results = threading.Event(), []
+
+        def slow_get(url, **kwargs):
+            release.wait(5)
+            response = Mock()
+            response.json.return_value = {"url": url}
+            return response
+
+        with patch("requests.get", side_effect=slow_get) as mocked:
+            threads = [threading.Thread(target=lambda: results.append(
+                get_json("http://a.io"))) for _ in range(6)]
+            for thread in threads:
+                thread.start()
+            for _ in range(500):
+                if self.delta()["coalesced"] == 5:
+                    break
+                time.sleep(0.01)
+            release.set()
+            for thread in threads:
+                thread.join()
+            get_json("http://b.io")
+        self.assertEqual(mocked.call_count, 2)
+        self.assertEqual(results, [{"url": "http://a.io"}] * 6)
+        self.assertEqual(self.delta(), {"requests": 2, "coalesced": 5})
+
+    def test_failure_is_shared(self):
+        """
+        Test that the exception of the shared request reaches the caller.
+        """
+        with patch("requests.get", side_effect=ConnectionError("down")):
+            with self.assertRaises(ConnectionError):
+                get_json("http://a.io")
+
+    async def test_tasks_share_one_request(self):
+        """
+        Test that concurrent tasks on an asyncio session share a request.
+        """
+        async def json(content_type=None):
+            await asyncio.sleep(0.01)
+            return {"b": 2}
+
+        response = MagicMock()
+        response.json = json
+        session = MagicMock()
+        session.get.return_value.__aenter__.return_value = response
+        results = await asyncio.gather(
+            *(get_json_async("http://y", session) for _ in range(5)))
+        self.assertEqual(results, [{"b": 2}] * 5)
+        session.get.assert_called_once_with("http://y")
+        self.assertEqual(self.delta(), {"requests": 1, "coalesced": 4})
+
+
+class TestJsonDecoder(unittest.TestCase):
+    """
+    Test case class for 'configure_json_decoder' and its registry.
+    """
+
+    def tearDown(self):
+        """Go back to 'response.json()'."""
+        utils.configure_json_decoder(None)
+
+    def response(self):
+        """Mock response with a JSON body."""
+        response = Mock(content=b'{"a": [1, 2]}', text='{"a": [1, 2]}')
+        response.json.return_value = {"from": "requests"}
+        return response
+
+    @parameterized.expand([(True, b'{"a": [1, 2]}'),
+                           (False, '{"a": [1, 2]}')])
+    def test_registered_decoder(self, from_bytes, raw):
+        """
+        Test that the selected decoder gets the bytes or the text.
+        """
+        loads = Mock(side_effect=json.loads)
+        utils.register_json_decoder("spy", loads)
+        self.addCleanup(utils._json_decoders.pop, "spy")
+        utils.configure_json_decoder("spy", from_bytes=from_bytes)
+        response = self.response()
+        with patch("requests.get", return_value=response):
+            self.assertEqual(get_json("http://a.io"), {"a": [1, 2]})
+        loads.assert_called_once_with(raw)
+        response.json.assert_not_called()
+
+    def test_auto_and_fallback(self):
+        """
+        Test 'auto' selection and the 'response.json()' fallback.
+        """
+        name = utils.configure_json_decoder("auto")
+        self.assertIn(name, utils.json_decoders())
+        if utils.orjson is not None:
+            self.assertEqual(name, "orjson")
+        utils.configure_json_decoder(None)
+        with patch("requests.get", return_value=self.response()):
+            self.assertEqual(get_json("http://a.io"), {"from": "requests"})
+        with self.assertRaises(ValueError):
+            utils.configure_json_decoder("nope")
+
+
+class TestMetrics(_LocalServerTestCase):
+    """
+    Test case class for 'add_metrics_sink' and 'MetricsRegistry'.
+    """
+
+    def setUp(self):
+        """Install a fresh registry as sink."""
+        self.registry = utils.MetricsRegistry()
+        utils.add_metrics_sink(self.registry)
+        self.addCleanup(utils.remove_metrics_sink, self.registry)
+
+    def test_exposition(self):
+        """
+        Test counters and histograms in the Prometheus text format.
+        """
+        utils.emit_metric("hits_total", 1, name='a"b')
+        utils.emit_metric("hits_total", 2, name='a"b')
+        for value in (0.003, 0.2, 20):
+            utils.emit_metric("wait_seconds", value)
+        text = self.registry.expose()
+        self.assertIn('# TYPE hits_total counter\n'
+                      'hits_total{name="a\\"b"} 3\n', text)
+        self.assertIn("# TYPE wait_seconds histogram\n", text)
+        for line in ('wait_seconds_bucket{le="0.001"} 0',
+                     'wait_seconds_bucket{le="0.005"} 1',
+                     'wait_seconds_bucket{le="0.25"} 2',
+                     'wait_seconds_bucket{le="10"} 2',
+                     'wait_seconds_bucket{le="+Inf"} 3',
+                     "wait_seconds_sum 20.203",
+                     "wait_seconds_count 3"):
+            self.assertIn(line + "\n", text)
+        self.assertEqual(self.registry.sample("hits_total"), (2, 3.0))
+        self.registry.clear()
+        self.assertEqual(self.registry.expose(), "")
+
+    def test_get_json(self):
+        """
+        Test the per-request status, phase timings and sizes.
+        """
+        self.assertEqual(get_json(self.url + "/a"), {"path": "/a"})
+        sample = self.registry.sample
+        self.assertEqual(sample("http_requests_total", status="200"),
+                         (1, 1.0))
+        self.assertEqual(sample("http_response_bytes"),
+                         (1, float(len(json.dumps({"path": "/a"})))))
+        for name in ("http_ttfb_seconds", "http_transfer_seconds",
+                     "json_decode_seconds"):
+            count, total = sample(name)
+            self.assertEqual(count, 1)
+            self.assertGreaterEqual(total, 0)
+
+    def test_memoize(self):
+        """
+        Test hit and miss counts of memoized properties.
+        """
+        class TestClass:
+            @memoize
+            def a_property(self):
+                return 42
+
+        spec = TestClass()
+        for _ in range(3):
+            spec.a_property
+        name = "TestMetrics.test_memoize.<locals>.TestClass.a_property"
+        self.assertEqual(
+            self.registry.sample("memoize_total", name=name, result="hit"),
+            (2, 2.0))
+        self.assertEqual(
+            self.registry.sample("memoize_total", result="miss"), (1, 1.0))
+
+    def test_disabled(self):
+        """
+        Test that a removed callback sink is no longer called.
+        """
+        sink = Mock()
+        utils.add_metrics_sink(sink)
+        get_json(self.url)
+        sink.assert_any_call("http_requests_total", 1, {"status": "200"})
+        utils.remove_metrics_sink(sink)
+        utils.remove_metrics_sink(self.registry)
+        self.addCleanup(utils.add_metrics_sink, self.registry)
+        self.assertFalse(utils.metrics_enabled())
+        sink.reset_mock()
+        get_json(self.url)
+        sink.assert_not_called()
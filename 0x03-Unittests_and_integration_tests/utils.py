@@ -1,22 +1,123 @@
 #!/usr/bin/env python3
 """Generic utilities for github org client.
 """
+import asyncio
+import codecs
+import contextvars
+import datetime
+import email.utils
+import hashlib
+import json
+import os
+import re
 import requests
+import struct
+import tempfile
+import threading
+import time
+import weakref
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from functools import wraps
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import (
     Mapping,
     Sequence,
     Any,
     Dict,
     Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
 )
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 __all__ = [
+    "BACKGROUND",
+    "INTERACTIVE",
+    "DirectoryStore",
+    "MemoizedProperty",
+    "MemoryStore",
+    "MetricsRegistry",
+    "RateLimiter",
+    "Record",
+    "Snapshot",
+    "SnapshotStore",
+    "CompiledPath",
     "access_nested_map",
+    "add_metrics_sink",
+    "async_memoize",
+    "coalesce_stats",
+    "compile_path",
+    "compile_projection",
+    "configure_coalescing",
+    "configure_http_cache",
+    "configure_json_decoder",
+    "configure_rate_limiter",
+    "configure_session",
+    "close_session",
+    "emit_metric",
     "get_json",
+    "get_json_async",
+    "get_json_page",
+    "invalidate",
+    "iter_json_items",
+    "json_decoders",
     "memoize",
+    "metrics_enabled",
+    "pool_stats",
+    "post_json",
+    "prime",
+    "register_json_decoder",
+    "remove_metrics_sink",
+    "request_priority",
+    "run_in_background",
 ]
 
+_session: Optional[requests.Session] = None
+_timeout: Union[None, float, Tuple[float, float]] = None
+_http_cache: Optional["MemoryStore"] = None
+_rate_limiter: Optional["RateLimiter"] = None
+_coalescing = False
+_flights: Dict[Tuple, Future] = {}
+_async_flights: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_flights_lock = threading.Lock()
+_coalesce_counts = {"requests": 0, "coalesced": 0}
+_json_decoders: Dict[str, Callable[[Union[bytes, str]], Any]] = {
+    "json": json.loads,
+}
+_json_loads: Optional[Callable[[Union[bytes, str]], Any]] = None
+_json_from_bytes = True
+_sinks: List[Callable[[str, float, Dict[str, str]], None]] = []
+
+INTERACTIVE = 0
+BACKGROUND = 1
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
 
 def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     """Access nested map with key path.
@@ -40,15 +141,1625 @@ def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
     return nested_map
 
 
-def get_json(url: str) -> Dict:
+_MISSING = object()
+
+
+class CompiledPath:
+    """Accessor for a fixed key path, built by `compile_path`.
+    """
+    __slots__ = ("path", "default", "get")
+
+    def __init__(self, path: Tuple, default: Any,
+                 get: Callable[[Mapping], Any]) -> None:
+        self.path = path
+        self.default = default
+        self.get = get
+
+    def __call__(self, nested_map: Mapping) -> Any:
+        return self.get(nested_map)
+
+    def many(self, nested_maps: Iterable[Mapping]) -> List[Any]:
+        """Evaluate the path on every map of `nested_maps`.
+        """
+        return list(map(self.get, nested_maps))
+
+    def __repr__(self) -> str:
+        return "compile_path({!r})".format(self.path)
+
+
+def compile_path(path: Sequence, default: Any = _MISSING) -> CompiledPath:
+    """Compile a key path into a fast accessor.
+    Behaves like `access_nested_map` but checks plain dicts by exact
+    type before falling back to the `Mapping` ABC, and unrolls short
+    paths. A "*" step expands over every value of a mapping or item
+    of a list, yielding a list of matches with missing branches
+    skipped.
+    Parameters
+    ----------
+    path: Sequence
+        a sequence of key representing a path to the value
+    default: Any
+        returned instead of raising `KeyError` when the path is missing
+    Example
+    -------
+    >>> license_key = compile_path(("license", "key"), default=None)
+    >>> license_key({"license": {"key": "mit"}})
+    'mit'
+    >>> license_key.many([{"license": None}, {}])
+    [None, None]
+    >>> compile_path(("a", "*", "b"))({"a": {"x": {"b": 1}, "y": {}}})
+    [1]
+    """
+    keys = tuple(path)
+
+    def missing(key: Any) -> Any:
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    if "*" in keys:
+        def get(nested_map: Mapping) -> Any:
+            matches: List[Any] = []
+            _expand(nested_map, keys, matches)
+            return matches
+    elif len(keys) == 1:
+        k0, = keys
+
+        def get(nested_map: Mapping) -> Any:
+            if nested_map.__class__ is dict or isinstance(nested_map,
+                                                          Mapping):
+                try:
+                    return nested_map[k0]
+                except KeyError:
+                    pass
+            return missing(k0)
+    elif len(keys) == 2:
+        k0, k1 = keys
+
+        def get(nested_map: Mapping) -> Any:
+            if nested_map.__class__ is dict or isinstance(nested_map,
+                                                          Mapping):
+                try:
+                    node = nested_map[k0]
+                except KeyError:
+                    return missing(k0)
+                if node.__class__ is dict or isinstance(node, Mapping):
+                    try:
+                        return node[k1]
+                    except KeyError:
+                        pass
+                return missing(k1)
+            return missing(k0)
+    else:
+        def get(nested_map: Mapping) -> Any:
+            node = nested_map
+            for key in keys:
+                if node.__class__ is not dict and not isinstance(node,
+                                                                 Mapping):
+                    return missing(key)
+                try:
+                    node = node[key]
+                except KeyError:
+                    return missing(key)
+            return node
+
+    return CompiledPath(keys, default, get)
+
+
+def _expand(node: Any, keys: Tuple, matches: List[Any]) -> None:
+    """Collect into `matches` the values reached by `keys` from `node`.
+    """
+    for i, key in enumerate(keys):
+        if key == "*":
+            if node.__class__ is dict or isinstance(node, Mapping):
+                children = node.values()
+            elif isinstance(node, (list, tuple)):
+                children = node
+            else:
+                return
+            for child in children:
+                _expand(child, keys[i + 1:], matches)
+            return
+        if node.__class__ is not dict and not isinstance(node, Mapping):
+            return
+        try:
+            node = node[key]
+        except KeyError:
+            return
+    matches.append(node)
+
+
+class Record(Mapping):
+    """Read-only mapping storing its values in slots.
+    Concrete record types are made by `compile_projection`, one per
+    set of keys, with `_slots` mapping each key to its slot name.
+    Unset slots behave as missing keys.
+    """
+    __slots__ = ()
+    _slots: Dict[str, str] = {}
+
+    def __getitem__(self, key: Any) -> Any:
+        try:
+            return getattr(self, self._slots[key])
+        except (KeyError, TypeError, AttributeError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        for key, slot in self._slots.items():
+            if hasattr(self, slot):
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return "Record({!r})".format(dict(self))
+
+    def __reduce__(self) -> Tuple:
+        return _record, (tuple(self._slots), dict(self))
+
+
+_record_types: Dict[Tuple[str, ...], type] = {}
+
+
+def _record_type(keys: Tuple[str, ...]) -> type:
+    """Record type with one slot per key, shared by equal key sets.
+    """
+    record_type = _record_types.get(keys)
+    if record_type is None:
+        slots = {key: "_{}".format(i) for i, key in enumerate(keys)}
+        record_type = _record_types.setdefault(keys, type(
+            "Record", (Record,),
+            {"__slots__": tuple(slots.values()), "_slots": slots}))
+    return record_type
+
+
+def _record(keys: Tuple[str, ...], values: Mapping) -> Record:
+    """Build a record of type `keys` holding `values`.
+    """
+    record = _record_type(keys)()
+    for key, value in values.items():
+        object.__setattr__(record, record._slots[key], value)
+    return record
+
+
+def compile_projection(fields: Iterable[str]) -> Callable[[Mapping], Record]:
+    """Compile dotted field names into a projection onto slim records.
+    The returned function copies only the requested fields of a nested
+    map into `Record` objects, nested fields into nested records.
+    Records are mappings, so `access_nested_map` and `compile_path`
+    work on them unchanged.
+    Parameters
+    ----------
+    fields: Iterable[str]
+        dotted key paths to keep, e.g. "license.key"
+    Example
+    -------
+    >>> project = compile_projection(("name", "license.key"))
+    >>> repo = project({"name": "x", "license": {"key": "mit", "n": 1},
+    ...                 "fork": False})
+    >>> dict(repo), dict(repo["license"])
+    ({'name': 'x', 'license': Record({'key': 'mit'})}, {'key': 'mit'})
+    """
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        *parents, leaf = field.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+            if node is None:
+                break
+        else:
+            node[leaf] = None
+    return _projector(tree)
+
+
+def _projector(tree: Dict[str, Any]) -> Callable[[Mapping], Record]:
+    """Projection function for a tree of keys.
+    """
+    record_type = _record_type(tuple(tree))
+    steps = [(key, record_type._slots[key],
+              None if sub is None else _projector(sub))
+             for key, sub in tree.items()]
+    setter = object.__setattr__
+
+    def project(nested_map: Mapping) -> Record:
+        record = record_type()
+        for key, slot, sub in steps:
+            try:
+                value = nested_map[key]
+            except KeyError:
+                continue
+            if sub is not None and (value.__class__ is dict
+                                    or isinstance(value, Mapping)):
+                value = sub(value)
+            setter(record, slot, value)
+        return record
+
+    return project
+
+
+def _jsonable(value: Any) -> Any:
+    """`json.dumps` fallback turning records into plain dicts.
+    """
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError("{!r} is not JSON serializable".format(value))
+
+
+def configure_session(
+    pool_connections: int = 10,
+    pool_maxsize: int = 10,
+    host_pool_sizes: Optional[Dict[str, int]] = None,
+    max_retries: int = 3,
+    backoff_factor: float = 0.5,
+    timeout: Union[None, float, Tuple[float, float]] = (3.05, 30),
+) -> requests.Session:
+    """Install a shared, connection-pooled session behind `get_json`.
+    Connections are kept alive and reused across calls instead of doing
+    a new TCP+TLS handshake per request. Until this is called `get_json`
+    uses a bare `requests.get`.
+    Parameters
+    ----------
+    pool_connections: int
+        number of per-host pools to keep
+    pool_maxsize: int
+        connections kept alive per host
+    host_pool_sizes: Dict[str, int]
+        per-prefix pool sizes, e.g. {"https://api.github.com/": 50}
+    max_retries: int
+        retries on connection errors and 5xx responses
+    backoff_factor: float
+        exponential backoff factor between retries
+    timeout: float or (connect, read) tuple
+        timeout applied to every request
+    Example
+    -------
+    >>> session = configure_session(host_pool_sizes={
+    ...     "https://api.github.com/": 50})
+    >>> get_json("https://api.github.com/orgs/google")  # doctest: +SKIP
+    """
+    global _session, _timeout
+
+    def adapter(maxsize: int) -> HTTPAdapter:
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+        )
+        return HTTPAdapter(pool_connections=pool_connections,
+                           pool_maxsize=maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter(pool_maxsize))
+    session.mount("https://", adapter(pool_maxsize))
+    for prefix, maxsize in (host_pool_sizes or {}).items():
+        session.mount(prefix, adapter(maxsize))
+
+    close_session()
+    _session, _timeout = session, timeout
+    return session
+
+
+def close_session() -> None:
+    """Close the shared session and go back to bare `requests.get`.
+    """
+    global _session, _timeout
+    if _session is not None:
+        _session.close()
+    _session, _timeout = None, None
+
+
+def pool_stats() -> Dict[str, int]:
+    """Connection reuse counters of the shared session.
+    A hit is a request served on an already open connection, a miss
+    is a request that had to open a new one.
+    Example
+    -------
+    >>> pool_stats()
+    {'requests': 0, 'connections': 0, 'hits': 0, 'misses': 0}
+    """
+    requests_count = connections = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                requests_count += pool.num_requests
+                connections += pool.num_connections
+    return {
+        "requests": requests_count,
+        "connections": connections,
+        "hits": requests_count - connections,
+        "misses": connections,
+    }
+
+
+def _encoded_size(value: Any) -> int:
+    """Size in bytes of the compact JSON encoding of `value`.
+    """
+    return len(json.dumps(value, separators=(",", ":"),
+                          default=_jsonable).encode("utf-8"))
+
+
+class MemoryStore:
+    """Thread-safe in-memory key/value store with LRU eviction.
+    Parameters
+    ----------
+    maxsize: int
+        number of entries kept before the least recently used is evicted
+    max_bytes: int
+        optional budget on the JSON-encoded size of the stored values
+    """
+
+    def __init__(self, maxsize: int = 1024,
+                 max_bytes: Optional[int] = None) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value stored under `key`, or `default`.
+        """
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                return default
+            return self._data[key]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting old entries if needed.
+        """
+        size = 0 if self.max_bytes is None else _encoded_size(value)
+        with self._lock:
+            self._pop(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.nbytes += size
+            while len(self._data) > self.maxsize or (
+                    self.max_bytes is not None
+                    and self.nbytes > self.max_bytes and self._data):
+                self._pop(next(iter(self._data)))
+
+    def _pop(self, key: str) -> None:
+        if key in self._data:
+            del self._data[key]
+            self.nbytes -= self._sizes.pop(key)
+
+    def delete(self, key: str) -> None:
+        """Drop `key` if present.
+        """
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        """Drop every entry.
+        """
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DirectoryStore:
+    """On-disk key/value store, one JSON file per key.
+    Writes are atomic renames, so several processes can share the
+    same directory; pointing it at a tmpfs such as /dev/shm keeps the
+    entries in shared memory.
+    Parameters
+    ----------
+    path: str
+        directory holding the entries, created if missing
+    max_bytes: int
+        optional budget on the directory size; the least recently used
+        files are removed first when a write goes over it
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, digest + ".json")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value stored under `key`, or `default`.
+        """
+        path = self._file(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                value = json.load(file)
+        except (OSError, ValueError):
+            return default
+        if self.max_bytes is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting old entries if needed.
+        """
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(value, file, separators=(",", ":"),
+                          default=_jsonable)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self.max_bytes is not None:
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def delete(self, key: str) -> None:
+        """Drop `key` if present.
+        """
+        try:
+            os.unlink(self._file(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        """Drop every entry.
+        """
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                os.unlink(os.path.join(self.path, name))
+
+
+class Snapshot(NamedTuple):
+    """A value loaded from a `SnapshotStore` with its TTL metadata.
+    """
+    value: Any
+    saved_at: float
+    ttl: float
+
+    @property
+    def expired(self) -> bool:
+        """Whether the snapshot is older than its TTL.
+        """
+        return time.time() - self.saved_at >= self.ttl
+
+
+class SnapshotStore:
+    """Persistent snapshots of payloads for warm starts.
+    Each key is written to its own binary file: a header with the
+    format, the save time and the TTL, then the payload as msgpack when
+    installed, zlib-compressed JSON otherwise. Keys are namespaced by
+    `version`, so bumping it ignores snapshots of an older layout.
+    Parameters
+    ----------
+    path: str
+        directory holding the snapshots, created if missing
+    ttl: float
+        seconds after which a snapshot is reported as expired
+    version: int
+        layout version of the stored payloads
+    """
+    _HEADER = struct.Struct("<4sBdd")
+    _MAGIC = b"GHSN"
+    _MSGPACK, _ZJSON = 1, 2
+
+    def __init__(self, path: str, ttl: float = 3600,
+                 version: int = 1) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.version = version
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        name = "v{}:{}".format(self.version, key).encode("utf-8")
+        return os.path.join(self.path,
+                            hashlib.sha1(name).hexdigest() + ".snap")
+
+    def load(self, key: str) -> Optional[Snapshot]:
+        """Return the snapshot saved under `key`, or None.
+        """
+        try:
+            with open(self._file(key), "rb") as file:
+                data = file.read()
+            magic, fmt, saved_at, ttl = self._HEADER.unpack_from(data)
+            body = data[self._HEADER.size:]
+            if magic != self._MAGIC:
+                return None
+            if fmt == self._MSGPACK and msgpack is not None:
+                value = msgpack.unpackb(body)
+            elif fmt == self._ZJSON:
+                value = json.loads(zlib.decompress(body))
+            else:
+                return None
+        except (OSError, ValueError, struct.error, zlib.error):
+            return None
+        return Snapshot(value, saved_at, ttl)
+
+    def save(self, key: str, value: Any) -> None:
+        """Write `value` under `key`, stamped with the current time.
+        """
+        if msgpack is not None:
+            fmt = self._MSGPACK
+            body = msgpack.packb(value, default=_jsonable)
+        else:
+            fmt = self._ZJSON
+            body = zlib.compress(json.dumps(
+                value, separators=(",", ":"),
+                default=_jsonable).encode("utf-8"))
+        header = self._HEADER.pack(self._MAGIC, fmt, time.time(), self.ttl)
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(header + body)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def run_in_background(fn: Callable, *args: Any) -> Future:
+    """Run `fn(*args)` on the shared background thread pool.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=4, thread_name_prefix="utils-background")
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def add_metrics_sink(sink: Callable[[str, float, Dict[str, str]], None]
+                     ) -> None:
+    """Send every metric to `sink(name, value, labels)`.
+    `sink` is a `MetricsRegistry` or any callable with that signature.
+    Names ending in "_total" are counters incremented by `value`, the
+    others are observations: "*_seconds" durations and "*_bytes"
+    sizes. Sinks are called inline by the measured code and should be
+    quick. While no sink is installed nothing is measured.
+    Emitted by `get_json` and friends:
+    http_requests_total{status}, http_ttfb_seconds (connect and wait
+    for the headers, from `response.elapsed`), http_transfer_seconds,
+    http_response_bytes, json_decode_seconds, http_cache_total{result}
+    and, from memoized properties, memoize_total{name, result}.
+    Example
+    -------
+    >>> registry = MetricsRegistry()
+    >>> add_metrics_sink(registry)
+    >>> emit_metric("http_requests_total", 1, status="200")
+    >>> registry.sample("http_requests_total")
+    (1, 1.0)
+    >>> remove_metrics_sink(registry)
+    """
+    _sinks.append(sink)
+
+
+def remove_metrics_sink(sink: Callable[[str, float, Dict[str, str]], None]
+                        ) -> None:
+    """Stop sending metrics to `sink`.
+    """
+    _sinks.remove(sink)
+
+
+def metrics_enabled() -> bool:
+    """Whether any metrics sink is installed, for callers to skip
+    measuring otherwise.
+    """
+    return bool(_sinks)
+
+
+def emit_metric(name: str, value: float, /, **labels: str) -> None:
+    """Send one counter increment or observation to every sink.
+    """
+    for sink in _sinks:
+        sink(name, value, labels)
+
+
+class MetricsRegistry:
+    """In-process metrics sink keeping counters and histograms.
+    Durations fall into `SECONDS` buckets and sizes into `BYTES`
+    buckets. `expose()` renders everything in the Prometheus text
+    format, `sample()` reads one metric back.
+    """
+
+    SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+               2.5, 5.0, 10.0)
+    BYTES = tuple(1 << shift for shift in range(8, 27, 2))
+
+    def __init__(self) -> None:
+        self._series: Dict[Tuple[str, Tuple], List] = {}
+        self._lock = threading.Lock()
+
+    def _buckets(self, name: str) -> Tuple[float, ...]:
+        if name.endswith("_total"):
+            return ()
+        return self.BYTES if name.endswith("_bytes") else self.SECONDS
+
+    def __call__(self, name: str, value: float,
+                 labels: Dict[str, str]) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                buckets = self._buckets(name)
+                series = self._series[key] = [0, 0.0, [0] * len(buckets)]
+            series[0] += 1
+            series[1] += value
+            counts = series[2]
+            if counts:
+                index = bisect_left(self._buckets(name), value)
+                if index < len(counts):
+                    counts[index] += 1
+
+    def sample(self, name: str, /,
+               **labels: str) -> Tuple[int, float]:
+        """Number and sum of the values of `name` over every series
+        carrying `labels`.
+        """
+        wanted = set(labels.items())
+        count, total = 0, 0.0
+        with self._lock:
+            for (series_name, series_labels), series in self._series.items():
+                if series_name == name and wanted <= set(series_labels):
+                    count += series[0]
+                    total += series[1]
+        return count, total
+
+    def clear(self) -> None:
+        """Forget every series.
+        """
+        with self._lock:
+            self._series.clear()
+
+    def expose(self) -> str:
+        """Prometheus text exposition of every series.
+        """
+        with self._lock:
+            series = sorted((key, (value[0], value[1], list(value[2])))
+                            for key, value in self._series.items())
+        lines = []
+        typed = None
+        for (name, labels), (count, total, counts) in series:
+            buckets = self._buckets(name)
+            if name != typed:
+                typed = name
+                lines.append("# TYPE {} {}".format(
+                    name, "histogram" if buckets else "counter"))
+            if not buckets:
+                lines.append("{}{} {}".format(
+                    name, _labels(labels), _number(total)))
+                continue
+            cumulative = 0
+            for bound, bucket in zip(buckets, counts):
+                cumulative += bucket
+                lines.append("{}_bucket{} {}".format(
+                    name, _labels(labels + (("le", _number(bound)),)),
+                    cumulative))
+            lines.append("{}_bucket{} {}".format(
+                name, _labels(labels + (("le", "+Inf"),)), count))
+            lines.append("{}_sum{} {}".format(
+                name, _labels(labels), _number(total)))
+            lines.append("{}_count{} {}".format(
+                name, _labels(labels), count))
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Prometheus label set, empty when there are no labels.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(
+        key, str(value).replace("\\", "\\\\").replace(
+            '"', '\\"').replace("\n", "\\n"))
+        for key, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    """Prometheus sample value, integral floats without a fraction.
+    """
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def configure_http_cache(store: Any = None) -> None:
+    """Enable conditional requests in `get_json`.
+    ETag and Last-Modified validators are kept per URL in `store`
+    (a `MemoryStore`, a `DirectoryStore` or anything with the same
+    `get`/`set` methods) together with the parsed payload. Later calls
+    send If-None-Match / If-Modified-Since and a 304 answer is served
+    from the store. Passing None disables the cache.
+    Example
+    -------
+    >>> configure_http_cache(MemoryStore(maxsize=512))
+    """
+    global _http_cache
+    _http_cache = store
+
+
+class RateLimiter:
+    """Token bucket pacing requests across threads and coroutines.
+    The bucket refills at `rate` tokens per second up to `burst`. Each
+    response's X-RateLimit-Remaining / X-RateLimit-Reset headers retune
+    the rate so the remaining quota is spread over the rest of the
+    window, and Retry-After (or an exhausted quota) pauses every caller
+    until the given time. Callers marked `BACKGROUND` only get a token
+    when no `INTERACTIVE` caller is waiting.
+    Parameters
+    ----------
+    rate: float
+        initial tokens per second, GitHub's 5000 requests/hour by default
+    burst: int
+        bucket capacity
+    """
+
+    def __init__(self, rate: float = 5000 / 3600, burst: int = 10) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._interactive_waiting = 0
+        self._cond = threading.Condition()
+
+    def _take(self, priority: int) -> float:
+        """Take a token, or return how long to wait before retrying.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if priority != INTERACTIVE and self._interactive_waiting:
+            return min(1 / self.rate, 0.1)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, priority: Optional[int] = None) -> None:
+        """Block the calling thread until a request may be sent.
+        `priority` defaults to the one set by `request_priority`.
+        """
+        if priority is None:
+            priority = _priority.get()
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+            try:
+                wait = self._take(priority)
+                while wait > 0:
+                    self._cond.wait(wait)
+                    wait = self._take(priority)
+            finally:
+                if priority == INTERACTIVE:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    async def acquire_async(self, priority: Optional[int] = None) -> None:
+        """Wait without blocking the event loop until a request may be sent.
+        """
+        if priority is None:
+            priority = _priority.get()
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._take(priority)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(wait)
+        finally:
+            if priority == INTERACTIVE:
+                with self._cond:
+                    self._interactive_waiting -= 1
+                    self._cond.notify_all()
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Retune the bucket from the rate-limit headers of a response.
+        """
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        retry_after = headers.get("Retry-After")
+        with self._cond:
+            now = time.monotonic()
+            delay = self._delay(retry_after)
+            if delay is not None:
+                self._blocked_until = max(self._blocked_until, now + delay)
+            if remaining is not None and reset is not None:
+                window = max(float(reset) - time.time(), 1.0)
+                if int(remaining) <= 0:
+                    self._blocked_until = max(self._blocked_until,
+                                              now + window)
+                else:
+                    self.rate = int(remaining) / window
+                    self.tokens = min(self.tokens, float(remaining))
+            self._cond.notify_all()
+
+    @staticmethod
+    def _delay(retry_after: Optional[str]) -> Optional[float]:
+        """Seconds to wait for a Retry-After header, given in seconds or
+        as an HTTP date; None when missing or unparseable.
+        """
+        if retry_after is None:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+        try:
+            when = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=datetime.timezone.utc)
+        return max((when - datetime.datetime.now(
+            datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+def configure_rate_limiter(
+        limiter: Optional[RateLimiter] = None) -> Optional[RateLimiter]:
+    """Pace every request of `get_json` through `limiter`.
+    Passing None disables pacing.
+    Example
+    -------
+    >>> limiter = configure_rate_limiter(RateLimiter())
+    >>> with request_priority(BACKGROUND):
+    ...     get_json("https://api.github.com/orgs/google")  # doctest: +SKIP
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+    return limiter
+
+
+@contextmanager
+def request_priority(priority: int) -> Iterator[None]:
+    """Run the enclosed requests at `INTERACTIVE` or `BACKGROUND` priority.
+    The priority follows the current thread or task.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _request(url: str, method: str = "get",
+             **kwargs: Any) -> requests.Response:
+    """Issue a request through the shared session, if any.
+    """
+    limiter = _rate_limiter
+    if limiter is None:
+        return _send(url, method, **kwargs)
+    for attempt in range(3):
+        limiter.acquire()
+        response = _send(url, method, **kwargs)
+        limiter.update(response.headers)
+        if not _rate_limited(response.status_code, response.headers):
+            break
+    return response
+
+
+def _rate_limited(status: int, headers: Mapping[str, str]) -> bool:
+    """Whether a response was refused for exceeding the rate limit.
+    """
+    return status in (403, 429) and (
+        "Retry-After" in headers
+        or headers.get("X-RateLimit-Remaining") == "0")
+
+
+def _send(url: str, method: str = "get",
+          **kwargs: Any) -> requests.Response:
+    """Send one request, reporting its status, timings and size to the
+    metrics sinks, if any.
+    """
+    if not _sinks:
+        return _open(url, method, **kwargs)
+    start = time.perf_counter()
+    response = _open(url, method, **kwargs)
+    total = time.perf_counter() - start
+    ttfb = response.elapsed.total_seconds()
+    emit_metric("http_requests_total", 1, status=str(response.status_code))
+    emit_metric("http_ttfb_seconds", ttfb)
+    if not kwargs.get("stream"):
+        # Streamed bodies are still unread, `iter_json_items` reports
+        # their size and transfer time once consumed.
+        emit_metric("http_transfer_seconds", max(total - ttfb, 0.0))
+        emit_metric("http_response_bytes", len(response.content))
+    return response
+
+
+def _open(url: str, method: str = "get",
+          **kwargs: Any) -> requests.Response:
+    """Send one request, through the shared session if configured.
+    """
+    if _session is None:
+        return getattr(requests, method)(url, **kwargs)
+    return getattr(_session, method)(url, timeout=_timeout, **kwargs)
+
+
+def register_json_decoder(
+        name: str, loads: Callable[[Union[bytes, str]], Any]) -> None:
+    """Make `loads` selectable by `configure_json_decoder(name)`.
+    """
+    _json_decoders[name] = loads
+
+
+def json_decoders() -> Dict[str, Callable[[Union[bytes, str]], Any]]:
+    """Registered JSON decoders by name.
+    """
+    return dict(_json_decoders)
+
+
+def configure_json_decoder(name: Optional[str] = "auto",
+                           from_bytes: bool = True) -> Optional[str]:
+    """Select the JSON decoder used by `get_json`.
+    Parameters
+    ----------
+    name: str
+        a name from `json_decoders()`, "auto" for the fastest installed
+        one (orjson, simdjson, ujson, then the stdlib "json"), or None
+        to go back to `requests`' `response.json()`
+    from_bytes: bool
+        decode the raw body bytes rather than the decoded text, which
+        saves an intermediate str copy
+    Example
+    -------
+    >>> configure_json_decoder("json")
+    'json'
+    >>> configure_json_decoder(None)
+    """
+    global _json_loads, _json_from_bytes
+    if name == "auto":
+        name = next(candidate for candidate
+                    in ("orjson", "simdjson", "ujson", "json")
+                    if candidate in _json_decoders)
+    if name is not None and name not in _json_decoders:
+        raise ValueError("unknown JSON decoder: {!r}".format(name))
+    _json_loads = None if name is None else _json_decoders[name]
+    _json_from_bytes = from_bytes
+    return name
+
+
+def _decode(response: requests.Response) -> Any:
+    """Decode the JSON body of `response`, timing it when metrics are
+    enabled.
+    """
+    if not _sinks:
+        return _loads(response)
+    start = time.perf_counter()
+    payload = _loads(response)
+    emit_metric("json_decode_seconds", time.perf_counter() - start)
+    return payload
+
+
+def _loads(response: requests.Response) -> Any:
+    """Decode the JSON body of `response` with the selected decoder.
+    """
+    loads = _json_loads
+    if loads is None:
+        return response.json()
+    return loads(response.content if _json_from_bytes else response.text)
+
+
+for _module in (orjson, simdjson, ujson):
+    if _module is not None:
+        register_json_decoder(_module.__name__, _module.loads)
+del _module
+
+
+def configure_coalescing(enabled: bool = True) -> None:
+    """Share one request between concurrent `get_json` callers.
+    While a request for a URL (and the same session credentials) is in
+    flight, other threads or tasks asking for it wait for its parsed
+    result instead of sending their own; they all receive the same
+    object, which must therefore not be mutated.
+    Example
+    -------
+    >>> configure_coalescing()
+    >>> coalesce_stats()["coalesced"]
+    0
+    """
+    global _coalescing
+    _coalescing = enabled
+
+
+def coalesce_stats() -> Dict[str, int]:
+    """Requests sent and calls served by another caller's request.
+    """
+    return dict(_coalesce_counts)
+
+
+def _flight_key(url: str) -> Tuple:
+    """In-flight table key: the URL plus the headers that change the
+    answer.
+    """
+    if _session is None:
+        return (url,)
+    headers = _session.headers
+    return (url, headers.get("Authorization"), headers.get("Accept"))
+
+
+def _get_json(url: str) -> Tuple[Any, Dict]:
+    """Fetch `url`, returning its JSON payload and parsed Link header.
+    """
+    if not _coalescing:
+        return _fetch_json(url)
+    key = _flight_key(url)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Future()
+            _coalesce_counts["requests"] += 1
+        else:
+            _coalesce_counts["coalesced"] += 1
+    if not leader:
+        return flight.result()
+    try:
+        result = _fetch_json(url)
+    except BaseException as exc:
+        with _flights_lock:
+            del _flights[key]
+        flight.set_exception(exc)
+        raise
+    with _flights_lock:
+        del _flights[key]
+    flight.set_result(result)
+    return result
+
+
+def _fetch_json(url: str) -> Tuple[Any, Dict]:
+    """Fetch `url` through the HTTP cache, if any.
+    """
+    store = _http_cache
+    if store is None:
+        response = _request(url)
+        return _decode(response), response.links
+
+    entry = store.get(url)
+    headers = _validators(entry)
+    response = _request(url, headers=headers) if headers else _request(url)
+    hit = response.status_code == 304 and entry is not None
+    if _sinks:
+        emit_metric("http_cache_total", 1, result="hit" if hit else "miss")
+    if hit:
+        return entry["payload"], entry["links"]
+
+    payload = _decode(response)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 200 and (etag or last_modified):
+        store.set(url, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "links": response.links,
+            "payload": payload,
+        })
+    return payload, response.links
+
+
+def _validators(entry: Optional[Dict]) -> Dict[str, str]:
+    """Conditional request headers revalidating a stored HTTP cache entry.
+    """
+    headers = {}
+    if entry is not None:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def get_json(url: str, stream: bool = False) -> Dict:
     """Get JSON from remote URL.
+    With `stream`, the URL must hold a JSON array and an iterator over
+    its items is returned instead, see `iter_json_items`.
+    """
+    if stream:
+        return iter_json_items(url)
+    return _get_json(url)[0]
+
+
+def iter_json_items(url: str, fields: Optional[Iterable[str]] = None,
+                    chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """Yield the items of a remote JSON array as they are downloaded.
+    The body is decoded incrementally from the socket, so only the item
+    being parsed is held in memory and the caller can process the first
+    items while the rest is still in flight.
+    Parameters
+    ----------
+    url: str
+        URL of a JSON array
+    fields: Iterable[str]
+        optional dotted fields to project each item on, as done by
+        `compile_projection`
+    chunk_size: int
+        number of bytes read from the socket at a time
+    Example
+    -------
+    >>> for repo in iter_json_items(
+    ...         "https://api.github.com/orgs/google/repos",
+    ...         fields=("name", "license.key")):  # doctest: +SKIP
+    ...     print(repo["name"])
     """
-    response = requests.get(url)
-    return response.json()
+    project = None if fields is None else compile_projection(fields)
+    response = _request(url, stream=True)
+    chunks = response.iter_content(chunk_size)
+    counted = _counted(chunks) if _sinks else None
+    try:
+        response.raise_for_status()
+        for item in _iter_array(chunks if counted is None else counted):
+            yield item if project is None else project(item)
+    finally:
+        if counted is not None:
+            counted.close()
+        response.close()
 
 
-def memoize(fn: Callable) -> Callable:
+def _counted(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass `chunks` through, reporting their total size and the time
+    spent reading them once exhausted or closed.
+    """
+    size = 0
+    elapsed = 0.0
+    chunks = iter(chunks)
+    try:
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            elapsed += time.perf_counter() - start
+            if chunk is None:
+                return
+            size += len(chunk)
+            yield chunk
+    finally:
+        emit_metric("http_transfer_seconds", elapsed)
+        emit_metric("http_response_bytes", size)
+
+
+_raw_decode = json.JSONDecoder().raw_decode
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _iter_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Incrementally decode the items of a top-level JSON array.
+    """
+    decode = codecs.getincrementaldecoder("utf-8")().decode
+    chunks = iter(chunks)
+    buffer, pos, eof = "", 0, False
+    expect = "["
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+        if pos < len(buffer):
+            char = buffer[pos]
+            if expect == "[":
+                if char != "[":
+                    raise ValueError("expected a JSON array")
+                pos, expect = pos + 1, "item or ]"
+                continue
+            if expect == ",":
+                if char not in ",]":
+                    raise ValueError(
+                        "expected ',' or ']' at offset {}".format(pos))
+                if char == "]":
+                    return
+                pos, expect = pos + 1, "item"
+                continue
+            if char == "]" and expect == "item or ]":
+                return
+            try:
+                item, end = _raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # a number cut by a chunk boundary also decodes ("12" of
+            # "12.5"), so it is only accepted once what follows is known
+            if end is not None and (eof or end < len(buffer) and (
+                    buffer[end] not in ".eE+-"
+                    or isinstance(item, (str, list, dict)))):
+                yield item
+                pos, expect = end, ","
+                continue
+        elif eof:
+            raise ValueError("truncated JSON array")
+        buffer, pos = buffer[pos:], 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += decode(b"", final=True)
+            eof = True
+        else:
+            buffer += decode(chunk)
+
+
+def post_json(url: str, payload: Any,
+              headers: Optional[Mapping[str, str]] = None) -> Any:
+    """POST `payload` as JSON to `url` and decode the JSON answer.
+    Goes through the same session, rate limiter, decoder and metrics
+    as `get_json`, but neither the HTTP cache nor coalescing apply.
+    Example
+    -------
+    >>> post_json("https://api.github.com/graphql",
+    ...           {"query": "{ viewer { login } }"})  # doctest: +SKIP
+    """
+    kwargs: Dict[str, Any] = {"json": payload}
+    if headers:
+        kwargs["headers"] = headers
+    return _decode(_request(url, "post", **kwargs))
+
+
+def get_json_page(url: str) -> Tuple[List, Optional[str]]:
+    """Get one page of a paginated JSON listing.
+    Returns the page and the URL of the next one, taken from the
+    `Link: <...>; rel="next"` response header, or None on the last page.
+    Example
+    -------
+    >>> url = "https://api.github.com/orgs/google/repos"
+    >>> while url:  # doctest: +SKIP
+    ...     page, url = get_json_page(url)
+    """
+    payload, links = _get_json(url)
+    return payload, links.get("next", {}).get("url")
+
+
+async def get_json_async(url: str, session: Any = None) -> Dict:
+    """Get JSON from remote URL without blocking the event loop.
+    Parameters
+    ----------
+    url: str
+        the URL to fetch
+    session: aiohttp.ClientSession
+        optional asyncio HTTP session, going through the same HTTP
+        cache, rate limiter retries, JSON decoder and metrics as
+        `get_json`. Without one, `get_json` runs in the loop's default
+        executor, still sharing the pooled session installed by
+        `configure_session`, at the cost of a thread per request.
+    Example
+    -------
+    >>> asyncio.run(get_json_async(
+    ...     "https://api.github.com/orgs/google"))  # doctest: +SKIP
+    """
+    loop = asyncio.get_running_loop()
+    if session is None:
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(None, context.run, get_json, url)
+    if not _coalescing:
+        return await _fetch_json_async(url, session)
+    flights = _async_flights.setdefault(loop, {})
+    key = (url, id(session))
+    task = flights.get(key)
+    if task is None:
+        _coalesce_counts["requests"] += 1
+        task = flights[key] = loop.create_task(
+            _fetch_json_async(url, session))
+        task.add_done_callback(lambda _: flights.pop(key, None))
+    else:
+        _coalesce_counts["coalesced"] += 1
+    return await asyncio.shield(task)
+
+
+async def _fetch_json_async(url: str, session: Any) -> Any:
+    """Fetch `url` through an asyncio HTTP session, the asyncio
+    counterpart of `_fetch_json` and `_request`.
+    """
+    store = _http_cache
+    entry = None if store is None else store.get(url)
+    headers = _validators(entry)
+    limiter = _rate_limiter
+    for attempt in range(3):
+        if limiter is not None:
+            await limiter.acquire_async()
+        start = time.perf_counter()
+        request = (session.get(url, headers=headers) if headers
+                   else session.get(url))
+        async with request as response:
+            if limiter is not None:
+                limiter.update(response.headers)
+            if _sinks:
+                emit_metric("http_requests_total", 1,
+                            status=str(response.status))
+                emit_metric("http_ttfb_seconds",
+                            time.perf_counter() - start)
+            if (limiter is not None and attempt < 2
+                    and _rate_limited(response.status, response.headers)):
+                continue
+            if store is None:
+                return await _decode_async(response)
+            hit = response.status == 304 and entry is not None
+            if _sinks:
+                emit_metric("http_cache_total", 1,
+                            result="hit" if hit else "miss")
+            if hit:
+                return entry["payload"]
+            payload = await _decode_async(response)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if response.status == 200 and (etag or last_modified):
+                store.set(url, {
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "links": {str(rel): {key: str(value)
+                                         for key, value in link.items()}
+                              for rel, link in response.links.items()},
+                    "payload": payload,
+                })
+            return payload
+
+
+async def _decode_async(response: Any) -> Any:
+    """Read and decode the JSON body of an asyncio HTTP response with
+    the selected decoder, reporting its size and timings like `_send`
+    and `_decode` when metrics are enabled.
+    """
+    loads = _json_loads
+    if loads is None and not _sinks:
+        return await response.json(content_type=None)
+    start = time.perf_counter()
+    body = await response.read()
+    if _sinks:
+        emit_metric("http_transfer_seconds", time.perf_counter() - start)
+        emit_metric("http_response_bytes", len(body))
+    if loads is None:
+        loads = json.loads
+    elif not _json_from_bytes:
+        body = await response.text()
+    if not _sinks:
+        return loads(body)
+    start = time.perf_counter()
+    payload = loads(body)
+    emit_metric("json_decode_seconds", time.perf_counter() - start)
+    return payload
+
+
+class MemoizedProperty(property):
+    """Property caching its value in `_<name>` on the instance.
+    Built by `memoize`, see there for the parameters. The descriptor
+    itself, reached through the class, exposes `cache_info()` and
+    `invalidate(obj)`.
+    """
+
+    def __init__(self, fn: Callable, ttl: Optional[float] = None,
+                 maxsize: Optional[int] = None,
+                 single_flight: bool = False,
+                 soft_ttl: Optional[float] = None) -> None:
+        self.fn = fn
+        self.ttl = ttl
+        self.soft_ttl = soft_ttl
+        self.maxsize = maxsize
+        self.single_flight = single_flight
+        self.attr_name = "_{}".format(fn.__name__)
+        self.stamp_name = "{}_at".format(self.attr_name)
+        self.hits = self.misses = self.refreshes = self.refresh_errors = 0
+        self._owners: "OrderedDict[int, weakref.ref]" = OrderedDict()
+        self._flights: Dict[int, Future] = {}
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+        @wraps(fn)
+        def memoized(obj):
+            """"memoized wraps"""
+            return self._lookup(obj)
+
+        super().__init__(memoized)
+
+    def _lookup(self, obj: Any) -> Any:
+        attr_name = self.attr_name
+        if hasattr(obj, attr_name) and not self._expired(obj):
+            with self._lock:
+                self.hits += 1
+            if _sinks:
+                self._emit("hit")
+            if self.maxsize is not None:
+                self._track(obj)
+            if self.soft_ttl is not None and self._age(obj) >= self.soft_ttl:
+                self._refresh_later(obj)
+            return getattr(obj, attr_name)
+        if self.single_flight:
+            return self._lookup_once(obj)
+        with self._lock:
+            self.misses += 1
+        if _sinks:
+            self._emit("miss")
+        value = self.fn(obj)
+        self._store(obj, value)
+        return value
+
+    def _emit(self, result: str) -> None:
+        emit_metric("memoize_total", 1, name=self.fn.__qualname__,
+                    result=result)
+
+    def _lookup_once(self, obj: Any) -> Any:
+        """Compute the value at most once, concurrent callers sharing it.
+        """
+        key = id(obj)
+        with self._lock:
+            if hasattr(obj, self.attr_name) and not self._expired(obj):
+                self.hits += 1
+                if _sinks:
+                    self._emit("hit")
+                return getattr(obj, self.attr_name)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if _sinks:
+            self._emit("miss" if leader else "hit")
+        if not leader:
+            return flight.result()
+        try:
+            value = self.fn(obj)
+        except BaseException as exc:
+            with self._lock:
+                del self._flights[key]
+            flight.set_exception(exc)
+            raise
+        self._store(obj, value)
+        with self._lock:
+            del self._flights[key]
+        flight.set_result(value)
+        return value
+
+    def _age(self, obj: Any) -> float:
+        """Seconds since the value was stored, 0 when unknown.
+        """
+        stamp = getattr(obj, self.stamp_name, None)
+        return 0.0 if stamp is None else time.monotonic() - stamp
+
+    def _expired(self, obj: Any) -> bool:
+        return self.ttl is not None and self._age(obj) >= self.ttl
+
+    def _refresh_later(self, obj: Any) -> None:
+        """Recompute the value of `obj` once on the background pool, at
+        `BACKGROUND` priority, readers keeping the current value
+        meanwhile.
+        """
+        key = id(obj)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                with request_priority(BACKGROUND):
+                    value = self.fn(obj)
+            except Exception:
+                with self._lock:
+                    self.refresh_errors += 1
+                    self._refreshing.discard(key)
+            else:
+                self._store(obj, value)
+                with self._lock:
+                    self.refreshes += 1
+                    self._refreshing.discard(key)
+
+        run_in_background(refresh)
+
+    def _store(self, obj: Any, value: Any) -> None:
+        setattr(obj, self.attr_name, value)
+        if self.ttl is not None or self.soft_ttl is not None:
+            setattr(obj, self.stamp_name, time.monotonic())
+        if self.maxsize is not None:
+            self._track(obj)
+
+    def _track(self, obj: Any) -> None:
+        """Record `obj` as most recently used and evict past `maxsize`.
+        Only bounded properties track their owners.
+        """
+        key = id(obj)
+        owners = self._owners
+        with self._lock:
+            if key in owners:
+                owners.move_to_end(key)
+                return
+            try:
+                owners[key] = weakref.ref(
+                    obj, lambda _, key=key: owners.pop(key, None))
+            except TypeError:
+                return
+            evicted = []
+            while len(owners) > self.maxsize:
+                evicted.append(owners.popitem(last=False)[1]())
+        for old in evicted:
+            if old is not None:
+                self._clear(old)
+
+    def _clear(self, obj: Any) -> None:
+        for name in (self.attr_name, self.stamp_name):
+            try:
+                delattr(obj, name)
+            except AttributeError:
+                pass
+
+    def prime(self, obj: Any, value: Any) -> None:
+        """Cache `value` on `obj` as if it had just been computed.
+        """
+        self._store(obj, value)
+
+    def invalidate(self, obj: Any) -> None:
+        """Drop the value cached on `obj`, if any.
+        """
+        with self._lock:
+            self._owners.pop(id(obj), None)
+        self._clear(obj)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Hit/miss statistics of this property across instances.
+        "size" counts the instances holding a value and is None unless
+        `maxsize` is set, unbounded properties not tracking them.
+        """
+        with self._lock:
+            counters = (self.hits, self.misses, self.refreshes,
+                        self.refresh_errors)
+            size = None if self.maxsize is None else len(self._owners)
+        return {
+            "hits": counters[0],
+            "misses": counters[1],
+            "refreshes": counters[2],
+            "refresh_errors": counters[3],
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "soft_ttl": self.soft_ttl,
+        }
+
+
+def memoize(fn: Optional[Callable] = None, *, ttl: Optional[float] = None,
+            maxsize: Optional[int] = None, single_flight: bool = False,
+            soft_ttl: Optional[float] = None) -> Callable:
     """Decorator to memoize a method.
+    Parameters
+    ----------
+    ttl: float
+        seconds after which a cached value is recomputed on next access
+        (the hard TTL)
+    soft_ttl: float
+        seconds after which a read still returns the cached value at
+        once but schedules one recomputation on the background pool
+        (stale-while-revalidate)
+    maxsize: int
+        number of instances allowed to hold a cached value at once, the
+        least recently used ones being dropped first
+    single_flight: bool
+        make the property thread-safe: concurrent first reads wait for
+        one computation and share its result (or its exception)
     Example
     -------
     class MyClass:
@@ -56,20 +1767,91 @@ def memoize(fn: Callable) -> Callable:
         def a_method(self):
             print("a_method called")
             return 42
+
+        @memoize(soft_ttl=60, ttl=600, maxsize=128)
+        def b_method(self):
+            return 43
     >>> my_object = MyClass()
     >>> my_object.a_method
     a_method called
     42
     >>> my_object.a_method
     42
+    >>> invalidate(my_object, "a_method")
+    >>> my_object.a_method
+    a_method called
+    42
+    >>> MyClass.a_method.cache_info()["hits"]
+    1
+    """
+    options = {"ttl": ttl, "maxsize": maxsize,
+               "single_flight": single_flight, "soft_ttl": soft_ttl}
+    if fn is None:
+        return lambda fn: MemoizedProperty(fn, **options)
+    return MemoizedProperty(fn, **options)
+
+
+def async_memoize(fn: Callable) -> Callable:
+    """Decorator to memoize a coroutine method.
+    The first call starts one task whose result is cached in
+    `_<name>`; concurrent callers await that same task, so the
+    coroutine runs once per instance. A failed task is dropped and
+    retried on next call, and a cancelled caller does not cancel it
+    for the others.
+    Example
+    -------
+    class MyClass:
+        @async_memoize
+        async def a_method(self):
+            print("a_method called")
+            return 42
+    >>> my_object = MyClass()
+    >>> asyncio.run(my_object.a_method())
+    a_method called
+    42
+    >>> asyncio.run(my_object.a_method())
+    42
     """
     attr_name = "_{}".format(fn.__name__)
 
     @wraps(fn)
-    def memoized(self):
+    async def memoized(self):
         """"memoized wraps"""
-        if not hasattr(self, attr_name):
-            setattr(self, attr_name, fn(self))
-        return getattr(self, attr_name)
+        task = getattr(self, attr_name, None)
+        if task is None:
+            task = asyncio.ensure_future(fn(self))
+            setattr(self, attr_name, task)
+        try:
+            return await asyncio.shield(task)
+        except BaseException:
+            if getattr(self, attr_name, None) is task and task.done():
+                delattr(self, attr_name)
+            raise
 
-    return property(memoized)
+    return memoized
+
+
+def invalidate(obj: Any, name: str) -> None:
+    """Drop the value memoized by property `name` on `obj`.
+    Example
+    -------
+    >>> invalidate(client, "org")  # doctest: +SKIP
+    """
+    descriptor = getattr(type(obj), name, None)
+    if isinstance(descriptor, MemoizedProperty):
+        descriptor.invalidate(obj)
+    elif hasattr(obj, "_{}".format(name)):
+        delattr(obj, "_{}".format(name))
+
+
+def prime(obj: Any, name: str, value: Any) -> None:
+    """Set the value memoized by property `name` on `obj`.
+    Example
+    -------
+    >>> prime(client, "org", {"repos_url": "..."})  # doctest: +SKIP
+    """
+    descriptor = getattr(type(obj), name, None)
+    if isinstance(descriptor, MemoizedProperty):
+        descriptor.prime(obj, value)
+    else:
+        setattr(obj, "_{}".format(name), value)